@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Raw METAR decoder throughput benchmark
+Decodes a synthetic mix of realistic reports (fractional and qualified
+visibility, VV, gusts, MPS winds, remarks) and reports decoded reports per
+second, single-threaded
+
+Usage:
+    python3 benchmarks/bench_decode.py [--count 200000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metar_decode import _token, decode  # noqa: E402
+
+WINDS = ['27015G25KT', 'VRB03KT', '00000KT', '18008KT', '24012MPS', '32020G35KT']
+VISIBILITIES = ['10SM', '1 1/2SM', 'M1/4SM', 'P6SM', '3SM', '1/2SM', '9999', '2 3/4SM']
+WEATHER = ['', '-RA BR', 'FG', '+TSRA', 'SN', 'VCSH', '-FZDZ BR']
+SKIES = ['CLR', 'FEW250', 'BKN008 OVC015', 'VV001', 'SCT030 BKN045', 'OVC004', 'BKN025CB']
+REMARKS = ['', ' RMK AO2', ' RMK AO2 SLP123 T01220100', ' RMK AO2 TSB05 PK WND 32035/1850']
+
+
+def make_reports(count: int, seed: int = 1) -> list:
+    """Generate `count` synthetic raw METARs"""
+    rng = random.Random(seed)
+    reports = []
+    for _ in range(count):
+        station = 'K' + ''.join(rng.choice(string.ascii_uppercase) for _ in range(3))
+        temp = rng.randint(-25, 40)
+        dewp = temp - rng.randint(0, 20)
+        temps = f"{'M' if temp < 0 else ''}{abs(temp):02d}/{'M' if dewp < 0 else ''}{abs(dewp):02d}"
+        parts = [rng.choice(['METAR', 'SPECI', '']), station, f"{rng.randint(1, 28):02d}{rng.randint(0, 23):02d}53Z",
+                 rng.choice(WINDS), rng.choice(VISIBILITIES), rng.choice(WEATHER),
+                 rng.choice(SKIES), temps, f"A{rng.randint(2900, 3050)}"]
+        reports.append(' '.join(part for part in parts if part) + rng.choice(REMARKS))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw METAR decoder throughput benchmark')
+    parser.add_argument('--count', type=int, default=200000,
+                        help='Reports per run')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs (best is reported)')
+    args = parser.parse_args()
+
+    reports = make_reports(args.count)
+    mean_length = sum(len(report) for report in reports) / len(reports)
+    print(f"{len(reports)} reports, mean length {mean_length:.0f} chars")
+
+    best = float('inf')
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        for report in reports:
+            decode(report)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        print(f"Run {run + 1}: {elapsed:.3f} s ({len(reports) / elapsed:,.0f} reports/s)")
+
+    print(f"\nBest: {len(reports) / best:,.0f} reports/s, {best / len(reports) * 1e6:.2f} us/report")
+    cache = _token.cache_info()
+    print(f"Token cache: {cache.currsize} distinct tokens, {cache.hits / (cache.hits + cache.misses):.1%} hit rate")
+
+
+if __name__ == "__main__":
+    main()
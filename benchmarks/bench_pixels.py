@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+LED write-latency benchmark
+Measures WeatherMap.update_leds and show() cost on the simulated pixel
+backend for strip sizes from 50 to 2000 LEDs, no hardware required
+
+Usage:
+    python3 benchmarks/bench_pixels.py [--sizes 50 500 2000] [--repeat 20]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metar_map import Region, WeatherMap  # noqa: E402
+
+CATEGORIES = ['VFR', 'MVFR', 'IFR', 'LIFR']
+
+
+def build_map(led_count: int, cache_dir: str) -> WeatherMap:
+    """Create a simulated map with one station on every LED"""
+    region = Region('bench', {f"S{i:04d}": i for i in range(led_count)},
+                    led_count=led_count, backend='sim')
+    return WeatherMap([region], cache_dir=cache_dir)
+
+
+def weather_for(weather_map: WeatherMap, shift: int) -> dict:
+    """Weather data with every station's category rotated by `shift`"""
+    return {airport: {'flight_category': CATEGORIES[(i + shift) % len(CATEGORIES)]}
+            for i, airport in enumerate(weather_map.stations())}
+
+
+def time_ms(func, repeat: int) -> float:
+    """Average wall time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_size(led_count: int, repeat: int, cache_dir: str) -> dict:
+    weather_map = build_map(led_count, cache_dir)
+    pixels = weather_map.regions[0].pixels
+    frames = [weather_for(weather_map, shift) for shift in range(2)]
+    counter = iter(range(10 ** 9))
+
+    # update_leds prints a line per LED - measure the code, not the terminal
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        def changing():
+            weather_map.update_leds(frames[next(counter) % 2])
+            sink.seek(0)
+            sink.truncate()
+
+        def unchanged():
+            weather_map.update_leds(frames[0])
+            sink.seek(0)
+            sink.truncate()
+
+        weather_map.update_leds(frames[0])
+        all_changed_ms = time_ms(changing, repeat)
+        weather_map.update_leds(frames[0])
+        unchanged_ms = time_ms(unchanged, repeat)
+
+    show_ms = time_ms(pixels.show, repeat)
+
+    return {
+        'leds': led_count,
+        'update_all_changed_ms': all_changed_ms,
+        'update_unchanged_ms': unchanged_ms,
+        'show_ms': show_ms,
+        'wire_ms': pixels.transfer_seconds() * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LED write-latency benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 250, 500, 1000, 2000],
+                        help='Strip sizes to measure')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Iterations per measurement')
+    args = parser.parse_args()
+
+    print(f"{'LEDs':>6} {'update (all changed)':>22} {'update (unchanged)':>20} "
+          f"{'show()':>10} {'wire time':>11}")
+    print("-" * 73)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for led_count in args.sizes:
+            r = bench_size(led_count, args.repeat, cache_dir)
+            print(f"{r['leds']:>6} {r['update_all_changed_ms']:>19.3f} ms {r['update_unchanged_ms']:>17.3f} ms "
+                  f"{r['show_ms']:>7.3f} ms {r['wire_ms']:>8.3f} ms")
+
+    print("\nwire time = modeled WS2812 transfer per show() (30 us/LED + 280 us latch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite
+Replays API fixtures of 30, 500 and 5,000 stations through the real fetch
+and display paths against a local stand-in for aviationweather.gov, with the
+simulated pixel backend in place of the strip:
+
+    scraper_fetch      METARScraper.get_metar_data (request, stream parse, classify)
+    map_fetch          WeatherMap.get_weather_data, full 200 response
+    map_fetch_304      WeatherMap.get_weather_data, revalidated (304) response
+    flight_category    WeatherMap._calculate_flight_category for every station
+    update_leds        WeatherMap.update_leds, every station changing category
+
+For each it reports stations/s, latency percentiles and the peak Python heap
+allocation of one run (tracemalloc). Results are saved as JSON under
+benchmarks/results/ together with the commit they were measured on, and
+--compare prints the change against an earlier results file.
+
+Usage:
+    python3 benchmarks/bench_suite.py [--sizes 30 500 5000] [--repeat 10]
+    python3 benchmarks/bench_suite.py --fixture benchmarks/fixtures/metar_ne.json
+    python3 benchmarks/bench_suite.py --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fixtures import load_fixture  # noqa: E402
+from metar_category import CATEGORIES, parse_ceiling, parse_visibility  # noqa: E402
+from metar_http import FetchClient  # noqa: E402
+from metar_map import Region, WeatherMap  # noqa: E402
+from scrape_metar import METARScraper  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+class FixtureServer:
+    """
+    Local stand-in for /api/data/metar
+
+    Answers with the fixture's reports for the requested ids (all of them if
+    no ids are given), in the API's JSON format, with an ETag so revalidation
+    can be measured too. Bodies are built once per query, so the server (which
+    shares the process) costs as little of the measured time as possible.
+    """
+
+    def __init__(self, records: List[Dict]):
+        self.by_station: Dict[str, List[Dict]] = {}
+        for record in records:
+            self.by_station.setdefault(record['icaoId'], []).append(record)
+        self.bodies: Dict[str, tuple] = {}
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; don't let Nagle delay the body
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                body, etag = server.response(urlsplit(self.path).query)
+
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/data/metar"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def response(self, query: str) -> tuple:
+        """Return (body, etag) for a query string"""
+        if query not in self.bodies:
+            params = parse_qs(query)
+            ids = params['ids'][0].split(',') if params.get('ids') else list(self.by_station)
+            body = json.dumps([record for station in ids
+                               for record in self.by_station.get(station, [])]).encode('utf-8')
+            self.bodies[query] = body, f'"{zlib.crc32(body):08x}"'
+        return self.bodies[query]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def measure(func: Callable, repeat: int, warmup: int = 1, before: Optional[Callable] = None) -> Dict:
+    """
+    Time repeated calls of func, then trace the heap of one more call
+
+    Args:
+        func: Code under test
+        repeat: Timed calls
+        warmup: Untimed calls first
+        before: Untimed setup run before every call
+    """
+    for _ in range(warmup):
+        if before:
+            before()
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if before:
+        before()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+
+    def percentile(p: float) -> float:
+        return timings[min(len(timings) - 1, int(round(p / 100 * (len(timings) - 1))))] * 1000
+
+    return {
+        'runs': len(timings),
+        'mean_ms': statistics.fmean(timings) * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': timings[-1] * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def bench_fixture(name: str, records: List[Dict], repeat: int) -> Dict[str, Dict]:
+    """Run every scenario on one fixture"""
+    latest = [record for record in records if record.get('mostRecent') == 1]
+    stations = [record['icaoId'] for record in latest]
+    count = len(stations)
+    server = FixtureServer(records)
+    results = {}
+
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir, contextlib.redirect_stdout(io.StringIO()) as sink:
+            def quiet(func):
+                def run():
+                    func()
+                    sink.seek(0)
+                    sink.truncate()
+                return run
+
+            scraper = METARScraper(client=FetchClient())
+            scraper.base_url = server.url
+            results['scraper_fetch'] = measure(quiet(lambda: scraper.get_metar_data(stations, hours=2)), repeat)
+
+            region = Region(name, {station: i for i, station in enumerate(stations)},
+                            led_count=count, backend='sim')
+            weather_map = WeatherMap([region], cache_dir=cache_dir)
+            weather_map.cache.client = FetchClient()
+            weather_map.api_url = server.url
+
+            def fresh():
+                """Empty the response cache so the next call gets a full response"""
+                weather_map.cache._parsed.clear()
+                for entry in os.listdir(cache_dir):
+                    os.remove(os.path.join(cache_dir, entry))
+
+            results['map_fetch'] = measure(quiet(lambda: weather_map.get_weather_data(stations)), repeat,
+                                           before=fresh)
+            results['map_fetch_304'] = measure(quiet(lambda: weather_map.get_weather_data(stations)), repeat)
+
+            inputs = [(parse_visibility(record.get('visib')), parse_ceiling(record.get('clouds', [])))
+                      for record in latest]
+            classify = weather_map._calculate_flight_category
+            results['flight_category'] = measure(lambda: [classify(v, c) for v, c in inputs], repeat)
+
+            # Alternate between two frames where every station changes category
+            frames = [{station: {'flight_category': CATEGORIES[(i + shift) % 4]}
+                       for i, station in enumerate(stations)} for shift in (0, 1)]
+            turn = iter(range(10 ** 9))
+            results['update_leds'] = measure(quiet(lambda: weather_map.update_leds(frames[next(turn) % 2])),
+                                             repeat)
+    finally:
+        server.close()
+
+    for result in results.values():
+        result['stations'] = count
+        result['stations_per_s'] = count / (result['mean_ms'] / 1000) if result['mean_ms'] else None
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """Current commit of the repository, if available"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Dict]], baseline: Optional[Dict] = None):
+    """Print a table of every fixture and scenario, with changes against a baseline"""
+    header = (f"{'fixture':>10} {'scenario':<16} {'stations/s':>12} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'peak KiB':>10}")
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print('-' * len(header))
+
+    for fixture, scenarios in results.items():
+        for scenario, r in scenarios.items():
+            line = (f"{fixture:>10} {scenario:<16} {r['stations_per_s']:>12,.0f} {r['p50_ms']:>9.3f} "
+                    f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['peak_kib']:>10.0f}")
+            if baseline:
+                old = baseline.get(fixture, {}).get(scenario)
+                line += f" {r['p50_ms'] / old['p50_ms'] - 1:>+8.0%}" if old and old['p50_ms'] else f" {'-':>9}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end METAR benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[30, 500, 5000],
+                        help='Generated fixture sizes (station counts)')
+    parser.add_argument('--fixture', action='append', default=[],
+                        help='Recorded fixture file to replay as well; repeat for several')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Timed runs per scenario')
+    parser.add_argument('--output', default=None,
+                        help='Results file (default benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', default=None, metavar='RESULTS',
+                        help='Earlier results file to compare p50 latency against')
+    args = parser.parse_args()
+
+    fixtures = [(str(size), load_fixture(size)) for size in args.sizes]
+    fixtures += [(os.path.splitext(os.path.basename(path))[0], load_fixture(path)) for path in args.fixture]
+
+    results = {}
+    for name, records in fixtures:
+        print(f"Running fixture {name} ({len(records)} reports)...", file=sys.stderr)
+        results[name] = bench_fixture(name, records, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+
+    print_results(results, baseline)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
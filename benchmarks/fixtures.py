@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+API response fixtures for the benchmarks
+Builds aviationweather.gov-shaped JSON METAR responses (the format=json
+output of /api/data/metar) for any number of stations, and records real
+responses for replay
+
+Generated fixtures are deterministic for a given size and seed, so results
+from different commits are comparable. They are written to
+benchmarks/fixtures/ on first use and are not committed.
+
+Usage:
+    python3 benchmarks/fixtures.py --sizes 30 500 5000
+    python3 benchmarks/fixtures.py --record ne --ids KBOS,KORH,KBDL
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+API_URL = 'https://aviationweather.gov/api/data/metar'
+
+# Visibility strings as the API reports them, weighted towards good weather
+VISIBILITIES = ['10+'] * 12 + ['6+', '7', '5', '4', '3', '2', '1.5', '1', '0.75', '0.5', '0.25']
+SKIES = [[], [], [('FEW', 250)], [('SCT', 45)], [('FEW', 60), ('BKN', 120)], [('BKN', 25)],
+         [('SCT', 12), ('OVC', 20)], [('BKN', 8)], [('OVC', 6)], [('OVC', 3)], [('OVX', 1)]]
+WEATHER = [None] * 8 + ['-RA', 'BR', '-SN', 'FG', '+TSRA', 'VCSH']
+BASE_TIME = 1792324800  # Fixed so fixtures never change between runs
+
+
+def _station_ids(count: int, rng: random.Random) -> List[str]:
+    """Unique ICAO-style station IDs"""
+    letters = string.ascii_uppercase
+    ids = [f"K{a}{b}{c}" for a, b, c in itertools.product(letters, repeat=3)]
+    if count > len(ids):
+        ids += [f"{p}{a}{b}{c}" for p in 'CP' for a, b, c in itertools.product(letters, repeat=3)]
+    return rng.sample(ids, count)
+
+
+def _visibility_sm(visib: str) -> str:
+    """Raw-text visibility group for an API visibility value"""
+    if visib.endswith('+'):
+        return 'P6SM' if visib == '6+' else '10SM'
+    value = float(visib)
+    whole, fraction = int(value), value - int(value)
+    fractions = {0.25: '1/4', 0.5: '1/2', 0.75: '3/4'}
+    if not fraction:
+        return f"{whole}SM"
+    return f"{whole} {fractions[fraction]}SM" if whole else f"{fractions[fraction]}SM"
+
+
+def make_record(station: str, rng: random.Random, obs_time: int, most_recent: bool) -> Dict:
+    """One API-shaped METAR record with consistent raw text"""
+    visib = rng.choice(VISIBILITIES)
+    clouds = rng.choice(SKIES)
+    wx = rng.choice(WEATHER)
+    wdir = rng.randrange(0, 360, 10)
+    wspd = rng.randint(0, 25)
+    wgst = wspd + rng.randint(8, 15) if wspd > 12 and rng.random() < 0.5 else None
+    temp = rng.randint(-20, 35)
+    dewp = temp - rng.randint(0, 15)
+    altim = round(rng.uniform(990, 1035), 1)
+    metar_type = 'SPECI' if rng.random() < 0.05 else 'METAR'
+
+    report = time.gmtime(obs_time)
+    wind = f"{wdir:03d}{wspd:02d}" + (f"G{wgst:02d}" if wgst else '') + 'KT'
+    sky = ' '.join(f"{cover.replace('OVX', 'VV')}{base:03d}" for cover, base in clouds) or 'CLR'
+    temps = '/'.join(f"{'M' if t < 0 else ''}{abs(t):02d}" for t in (temp, dewp))
+    raw = ' '.join(part for part in (
+        station, time.strftime('%d%H%MZ', report), wind, _visibility_sm(visib), wx, sky, temps,
+        f"A{round(altim / 33.8639 * 100):04d}", 'RMK AO2') if part)
+
+    return {
+        'icaoId': station,
+        'receiptTime': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(obs_time + 120)),
+        'obsTime': obs_time,
+        'reportTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', report),
+        'temp': temp,
+        'dewp': dewp,
+        'wdir': wdir,
+        'wspd': wspd,
+        'wgst': wgst,
+        'visib': visib,
+        'altim': altim,
+        'wxString': wx,
+        'metarType': metar_type,
+        'rawOb': f"{metar_type} {raw}",
+        'mostRecent': 1 if most_recent else 0,
+        'lat': round(rng.uniform(25.0, 49.0), 4),
+        'lon': round(rng.uniform(-124.0, -67.0), 4),
+        'elev': rng.randint(0, 2500),
+        'name': f"{station[1:]} Municipal, US",
+        'clouds': [{'cover': cover, 'base': base * 100} for cover, base in clouds],
+    }
+
+
+def make_records(count: int, seed: int = 1) -> List[Dict]:
+    """
+    Build an API response for `count` stations
+
+    Like the real API with hours=2, about half the stations also have an
+    older report (mostRecent 0) after their latest one.
+    """
+    rng = random.Random(seed)
+    records = []
+    for station in _station_ids(count, rng):
+        obs_time = BASE_TIME - rng.randint(0, 59) * 60
+        records.append(make_record(station, rng, obs_time, most_recent=True))
+        if rng.random() < 0.5:
+            records.append(make_record(station, rng, obs_time - 3600, most_recent=False))
+    return records
+
+
+def fixture_path(name) -> str:
+    """Path of a fixture by size or name"""
+    return os.path.join(FIXTURES_DIR, f"metar_{name}.json")
+
+
+def load_fixture(size_or_path, seed: int = 1) -> List[Dict]:
+    """
+    Load a fixture, generating a sized one on first use
+
+    Args:
+        size_or_path: Station count, or the path of a recorded fixture
+        seed: Generator seed for sized fixtures
+    """
+    if isinstance(size_or_path, str):
+        with open(size_or_path, 'r') as f:
+            return json.load(f)
+
+    path = fixture_path(size_or_path)
+    if not os.path.exists(path):
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(make_records(size_or_path, seed), f)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def record_fixture(name: str, ids: List[str], hours: int = 2, url: str = API_URL) -> Optional[str]:
+    """
+    Save a live API response for replay
+
+    Returns:
+        Path of the saved fixture, or None if the request failed
+    """
+    import requests
+
+    from metar_http import get_client
+
+    params = {'ids': ','.join(ids), 'format': 'json', 'taf': 'false', 'hours': hours}
+    try:
+        response = get_client().get(url, params=params, timeout=30)
+        response.raise_for_status()
+        records = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"Recording failed: {e}")
+        return None
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = fixture_path(name)
+    with open(path, 'w') as f:
+        json.dump(records, f)
+    print(f"Recorded {len(records)} reports for {len(ids)} stations to {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate or record METAR API fixtures')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[30, 500, 5000],
+                        help='Station counts to generate fixtures for')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Generator seed')
+    parser.add_argument('--record', metavar='NAME',
+                        help='Record a live API response as fixtures/metar_NAME.json instead')
+    parser.add_argument('--ids', default='',
+                        help='Comma-separated station IDs to record')
+    parser.add_argument('--region', action='append', dest='regions', default=[],
+                        help='Record the airports of a region profile; repeat for several')
+    args = parser.parse_args()
+
+    if args.record:
+        from metar_map import load_profile
+
+        ids = {station.strip().upper(): None for station in args.ids.split(',') if station.strip()}
+        for region in args.regions:
+            ids.update(dict.fromkeys(airport['id'] for airport in load_profile(region)['airports']))
+        if not ids:
+            parser.error('--record needs --ids or --region')
+        sys.exit(0 if record_fixture(args.record, list(ids)) else 1)
+
+    for size in args.sizes:
+        path = fixture_path(size)
+        if os.path.exists(path):
+            os.remove(path)
+        records = load_fixture(size, args.seed)
+        print(f"{path}: {len(records)} reports, {os.path.getsize(path) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
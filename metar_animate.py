@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Fixed-frame-rate LED animation engine
+Cross-fades stations between their old and new category colors and blinks
+stations reporting gusts or thunderstorms, rendering into a region's
+FrameBuffer at a fixed frame rate
+
+Easing and blink curves are precomputed byte tables indexed by animation
+phase. A blinking LED takes its bytes for the current level straight from
+the color pipeline's per-level tables, and a cross-fade is one integer blend
+over the whole frame.
+Render time is measured every frame; when the average exceeds the CPU
+budget the frame rate steps down (and back up once there is headroom), and
+frames the loop could not start on time are counted as missed. With
+nothing animating the engine sleeps until new targets arrive.
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+
+from metar_color import OFF_CODE, ColorPipeline, blend
+from metar_frame import FrameBuffer
+from metar_lazy import lazy_import
+
+# Imported when the first engine is created, in the async run mode
+asyncio = lazy_import('asyncio')
+
+# Entries per precomputed curve; an animation phase 0.0-1.0 maps to an index
+TABLE_SIZE = 256
+LEVEL_MAX = 255
+
+# Cosine ease-in-out, 0 -> 255
+EASE_TABLE = bytes(round(LEVEL_MAX * (1 - math.cos(math.pi * i / (TABLE_SIZE - 1))) / 2)
+                   for i in range(TABLE_SIZE))
+# Gusts: a slow breathing pulse between 30% and full brightness
+PULSE_TABLE = bytes(round(LEVEL_MAX * (0.65 + 0.35 * math.cos(2 * math.pi * i / TABLE_SIZE)))
+                    for i in range(TABLE_SIZE))
+# Thunderstorms: two short flashes per period
+FLASH_TABLE = bytes(LEVEL_MAX if (i < TABLE_SIZE // 8 or TABLE_SIZE // 4 <= i < 3 * TABLE_SIZE // 8) else 0
+                    for i in range(TABLE_SIZE))
+
+# Effects a station can carry, with their curve and period in seconds
+GUST = 'gust'
+STORM = 'storm'
+EFFECTS = {GUST: (PULSE_TABLE, 2.0), STORM: (FLASH_TABLE, 1.5)}
+
+# Frame rates tried, highest first, when stepping down to stay in budget
+FPS_STEPS = (60, 30, 20, 15, 10, 5, 2)
+
+
+class Animator:
+    def __init__(self, frame: FrameBuffer, pipeline: ColorPipeline, fps: int = 30, min_fps: int = 2,
+                 cpu_budget: float = 0.2, fade_seconds: float = 1.5, budget_window_seconds: float = 2.0):
+        """
+        Initialize the animation engine for one strip
+
+        Args:
+            frame: Frame buffer of the strip to drive
+            pipeline: Color pipeline of the strip, for blink levels
+            fps: Target frame rate
+            min_fps: Lowest frame rate the engine degrades to
+            cpu_budget: Fraction of one CPU core rendering may use (0.0-1.0)
+            fade_seconds: Cross-fade duration
+            budget_window_seconds: How often the frame rate is re-evaluated
+        """
+        self.frame = frame
+        self.pipeline = pipeline
+        self.led_count = frame.led_count
+        self.target_fps = fps
+        self.fps = fps
+        self.min_fps = min_fps
+        self.cpu_budget = cpu_budget
+        self.fade_seconds = fade_seconds
+        self.budget_window = budget_window_seconds
+
+        self.start_frame = bytes(self.led_count * 3)
+        self.target_frame = bytes(self.led_count * 3)
+        self.current = bytes(self.led_count * 3)
+        self.codes: List[int] = [OFF_CODE] * self.led_count
+        self.effects: Dict[int, str] = {}
+        self.fade_started: Optional[float] = None
+
+        # Set when new targets arrive, so an idle engine wakes up
+        self.wake = asyncio.Event()
+
+        # Frame accounting
+        self.frames = 0
+        self.missed_frames = 0
+        self.render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.fps_changes = 0
+        self._window_frames = 0
+        self._window_render = 0.0
+        self._window_started = time.monotonic()
+
+    def set_frame(self, frame: bytes, codes: Sequence[int], effects: Optional[Dict[int, str]] = None):
+        """
+        Start animating towards a new frame
+
+        Args:
+            frame: Target strip bytes, as composed by the color pipeline
+            codes: Category code per LED the frame was composed from
+            effects: LED index to GUST or STORM for LEDs that should blink
+        """
+        if frame == self.target_frame and (effects or {}) == self.effects:
+            return  # Already heading there - don't restart a running fade
+
+        # Fade from what the strip is showing (e.g. a restored state)
+        committed = self.frame.committed
+        self.start_frame = committed if committed is not None and len(committed) == len(frame) else self.current
+        self.target_frame = bytes(frame)
+        self.codes = list(codes)
+        self.effects = dict(effects or {})
+        self.fade_started = time.monotonic()
+        self.wake.set()
+
+    def active(self) -> bool:
+        """True while a cross-fade is running or any LED is blinking"""
+        return self.fade_started is not None or bool(self.effects)
+
+    def render(self, now: float) -> bytes:
+        """Compose the frame for time `now` (monotonic seconds)"""
+        frame = self.target_frame
+
+        if self.fade_started is not None:
+            progress = (now - self.fade_started) / self.fade_seconds
+            if progress >= 1 or self.start_frame == frame:
+                self.fade_started = None
+            else:
+                frame = blend(self.start_frame, frame, EASE_TABLE[int(progress * (TABLE_SIZE - 1))])
+
+        if self.effects:
+            frame = bytearray(frame)
+            levels = self.pipeline.levels
+            for index, effect in self.effects.items():
+                table, period = EFFECTS[effect]
+                level = table[int((now % period) / period * TABLE_SIZE)]
+                frame[index * 3:index * 3 + 3] = levels[self.codes[index]][level * 3:level * 3 + 3]
+
+        return frame
+
+    def tick(self, now: Optional[float] = None) -> float:
+        """
+        Render and commit one frame
+
+        Returns:
+            Seconds spent rendering and writing the frame
+        """
+        start = time.perf_counter()
+        frame = self.render(now if now is not None else time.monotonic())
+        self.frame.commit(frame)
+        self.current = bytes(frame)
+        elapsed = time.perf_counter() - start
+
+        self.frames += 1
+        self.render_seconds += elapsed
+        self.max_render_seconds = max(self.max_render_seconds, elapsed)
+        self._window_frames += 1
+        self._window_render += elapsed
+        return elapsed
+
+    def adjust_rate(self, now: float):
+        """
+        Step the frame rate down when rendering exceeds the CPU budget, and
+        back up when there is room for the next higher rate
+        """
+        window = now - self._window_started
+        if window < self.budget_window or not self._window_frames:
+            return
+
+        per_frame = self._window_render / self._window_frames
+        load = per_frame * self.fps
+        self._window_frames = 0
+        self._window_render = 0.0
+        self._window_started = now
+
+        steps = [fps for fps in FPS_STEPS if self.min_fps <= fps <= self.target_fps] or [self.target_fps]
+        if load > self.cpu_budget:
+            lower = [fps for fps in steps if fps < self.fps and per_frame * fps <= self.cpu_budget]
+            new_fps = lower[0] if lower else steps[-1]
+        else:
+            # Only step up if the next rate would still leave a margin
+            higher = [fps for fps in steps if fps > self.fps and per_frame * fps <= self.cpu_budget * 0.7]
+            new_fps = higher[-1] if higher else self.fps
+
+        if new_fps != self.fps:
+            print(f"Animation: {per_frame * 1000:.2f} ms/frame, {load:.0%} CPU at {self.fps} fps "
+                  f"- switching to {new_fps} fps")
+            self.fps = new_fps
+            self.fps_changes += 1
+
+    async def run(self):
+        """Animate until cancelled"""
+        next_frame = time.monotonic()
+
+        while True:
+            if not self.active():
+                # Nothing moving: the committed frame stays on the strip
+                self.wake.clear()
+                await self.wake.wait()
+                next_frame = time.monotonic()
+
+            now = time.monotonic()
+            period = 1 / self.fps
+            late = now - next_frame
+            if late >= period:
+                # The loop could not start these frames on time
+                skipped = int(late / period)
+                self.missed_frames += skipped
+                next_frame += skipped * period
+
+            self.tick(now)
+            self.adjust_rate(now)
+
+            next_frame += period
+            await asyncio.sleep(max(0.0, next_frame - time.monotonic()))
+
+    def stats(self) -> Dict:
+        """Return frame rate and render time accounting"""
+        frames = self.frames or 1
+        return {
+            'fps': self.fps,
+            'target_fps': self.target_fps,
+            'frames': self.frames,
+            'missed_frames': self.missed_frames,
+            'avg_render_ms': self.render_seconds / frames * 1000,
+            'max_render_ms': self.max_render_seconds * 1000,
+            'fps_changes': self.fps_changes,
+        }
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Local observation archive
+Appends every cycle's observations to an SQLite database, one row per
+station and observation time, so history survives past update_leds and
+can be queried per station ("category history of KBOS over the last 48 h")
+
+Each cycle is one batched INSERT OR IGNORE in a single transaction, so
+re-fetching an unchanged METAR adds nothing. Rows are clustered by
+(station, obs_time), which makes a per-station history a range scan.
+Rows older than the retention period are pruned, and the file is
+compacted once a day.
+
+Usage:
+    python3 metar_archive.py KBOS [--hours 48] [--archive PATH]
+"""
+
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from metar_category import CATEGORIES, CATEGORY_CODES, UNKNOWN
+
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metar_archive.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    station TEXT NOT NULL,
+    obs_time INTEGER NOT NULL,
+    category INTEGER NOT NULL,
+    visibility_mi REAL,
+    ceiling_ft INTEGER,
+    temp REAL,
+    wind_speed INTEGER,
+    metar_type TEXT,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (station, obs_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_by_time ON observations (obs_time);
+"""
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO observations
+    (station, obs_time, category, visibility_mi, ceiling_ft, temp, wind_speed, metar_type, fetched_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+COLUMNS = ('station', 'obs_time', 'flight_category', 'visibility_mi', 'ceiling_ft', 'temp',
+           'wind_speed', 'metar_type', 'fetched_at')
+
+
+class ObservationArchive:
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, retention_days: float = 30,
+                 compact_interval_hours: float = 24):
+        """
+        Open (or create) the archive
+
+        Args:
+            path: SQLite database file (':memory:' for a throwaway archive)
+            retention_days: Observations older than this are pruned
+            compact_interval_hours: How often maybe_compact() prunes and
+                                    rebuilds the file
+        """
+        self.path = path
+        self.retention_seconds = retention_days * 24 * 60 * 60
+        self.compact_interval = compact_interval_hours * 60 * 60
+        self.last_compacted = time.time()
+        self.last_insert_ms = 0.0
+
+        # Autocommit mode; transactions are opened explicitly per batch
+        self.conn = sqlite3.connect(path, isolation_level=None)
+
+        # WAL with normal sync: one fsync per checkpoint instead of per commit,
+        # which keeps a cycle's insert in the low milliseconds on an SD card
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database"""
+        self.conn.close()
+
+    def insert_cycle(self, weather_data: Dict, fetched_at: Optional[float] = None) -> int:
+        """
+        Append one cycle's observations
+
+        Records without an observation time cannot be deduplicated and are
+        skipped.
+
+        Args:
+            weather_data: Airport code to weather record, as built by WeatherMap
+            fetched_at: Unix time of the fetch (now if None)
+
+        Returns:
+            Number of new observations stored
+        """
+        start = time.perf_counter()
+        fetched_at = int(fetched_at if fetched_at is not None else time.time())
+
+        rows = []
+        for station, data in weather_data.items():
+            obs_time = data.get('obs_time')
+            if obs_time is None:
+                continue
+            rows.append((station, int(obs_time),
+                         CATEGORY_CODES.get(data.get('flight_category'), UNKNOWN),
+                         data.get('visibility_mi'), data.get('ceiling_ft'), data.get('temp'),
+                         data.get('wind_speed'), data.get('metar_type'), fetched_at))
+
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(INSERT_SQL, rows)
+        inserted = self.conn.total_changes - before
+
+        self.last_insert_ms = (time.perf_counter() - start) * 1000
+        return inserted
+
+    def history(self, station: str, hours: float = 48, now: Optional[float] = None) -> List[Dict]:
+        """
+        Return a station's archived observations, oldest first
+
+        Args:
+            station: Airport code
+            hours: How far back to look
+            now: End of the window as Unix time (now if None)
+        """
+        now = now if now is not None else time.time()
+        cursor = self.conn.execute(
+            "SELECT station, obs_time, category, visibility_mi, ceiling_ft, temp, wind_speed, "
+            "metar_type, fetched_at FROM observations "
+            "WHERE station = ? AND obs_time >= ? AND obs_time <= ? ORDER BY obs_time",
+            (station, int(now - hours * 60 * 60), int(now)))
+
+        observations = []
+        for row in cursor:
+            observation = dict(zip(COLUMNS, row))
+            observation['flight_category'] = CATEGORIES[observation['flight_category']]
+            observations.append(observation)
+        return observations
+
+    def category_history(self, station: str, hours: float = 48,
+                         now: Optional[float] = None) -> List[Tuple[int, str]]:
+        """
+        Return a station's flight category over time
+
+        Args:
+            station: Airport code
+            hours: How far back to look
+            now: End of the window as Unix time (now if None)
+
+        Returns:
+            (obs_time, category) pairs, oldest first
+        """
+        now = now if now is not None else time.time()
+        cursor = self.conn.execute(
+            "SELECT obs_time, category FROM observations "
+            "WHERE station = ? AND obs_time >= ? AND obs_time <= ? ORDER BY obs_time",
+            (station, int(now - hours * 60 * 60), int(now)))
+        return [(obs_time, CATEGORIES[category]) for obs_time, category in cursor]
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete observations older than the retention period, returning the count"""
+        now = now if now is not None else time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            cursor = self.conn.execute("DELETE FROM observations WHERE obs_time < ?",
+                                       (int(now - self.retention_seconds),))
+        return cursor.rowcount
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """
+        Prune old observations and rebuild the file to return the free space
+
+        Returns:
+            Number of observations pruned
+        """
+        pruned = self.prune(now)
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.last_compacted = time.time()
+        return pruned
+
+    def maybe_compact(self) -> Optional[int]:
+        """Compact if the compaction interval has passed; returns the pruned count or None"""
+        if time.time() - self.last_compacted < self.compact_interval:
+            return None
+        return self.compact()
+
+    def stats(self) -> Dict:
+        """Return row, station and time-span counts for the archive"""
+        count, stations, oldest, newest = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT station), MIN(obs_time), MAX(obs_time) FROM observations"
+        ).fetchone()
+        return {'observations': count, 'stations': stations, 'oldest': oldest, 'newest': newest,
+                'last_insert_ms': self.last_insert_ms}
+
+
+def main():
+    """Print a station's archived category history"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query the local METAR observation archive')
+    parser.add_argument('station', help='Airport code, e.g. KBOS')
+    parser.add_argument('--hours', type=float, default=48,
+                        help='How far back to look')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_PATH,
+                        help='Archive database path')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"No archive at {args.archive}")
+        return
+
+    archive = ObservationArchive(args.archive)
+    try:
+        observations = archive.history(args.station.upper(), hours=args.hours)
+        if not observations:
+            print(f"No observations for {args.station.upper()} in the last {args.hours:g} h")
+            return
+
+        print(f"{'Observed (UTC)':<18} {'Category':<8} {'Vis':<8} {'Ceiling':<10} {'Type':<6}")
+        print("-" * 54)
+        for obs in observations:
+            observed = time.strftime('%Y-%m-%d %H:%M', time.gmtime(obs['obs_time']))
+            visibility = f"{obs['visibility_mi']:.1f} mi" if obs['visibility_mi'] is not None else "N/A"
+            ceiling = f"{obs['ceiling_ft']} ft" if obs['ceiling_ft'] is not None else "Clear"
+            print(f"{observed:<18} {obs['flight_category']:<8} {visibility:<8} {ceiling:<10} "
+                  f"{obs['metar_type'] or '':<6}")
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
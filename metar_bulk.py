@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Bulk METAR ingest from the aviationweather.gov all-stations cache files
+Downloads the gzipped CSV or XML dataset once, decompresses and parses it
+as a stream, and keeps a snapshot any station subset can be served from
+
+Records are converted to the same shape as the JSON API's METAR objects
+('icaoId', 'visib', 'clouds', ...) so the existing parsers can use them.
+"""
+
+import csv
+import gzip
+import io
+import time
+import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set
+
+from metar_http import FetchClient, get_client
+from metar_metrics import CycleMetrics
+from metar_spatial import BBox, in_bbox
+
+BULK_CSV_URL = "https://aviationweather.gov/data/cache/metars.cache.csv.gz"
+BULK_XML_URL = "https://aviationweather.gov/data/cache/metars.cache.xml.gz"
+
+GZIP_MAGIC = b'\x1f\x8b'
+INHG_TO_HPA = 33.8639
+
+# Bulk dataset field -> JSON API field
+FIELD_MAP = {
+    'raw_text': 'rawOb',
+    'station_id': 'icaoId',
+    'temp_c': 'temp',
+    'dewpoint_c': 'dewp',
+    'wind_dir_degrees': 'wdir',
+    'wind_speed_kt': 'wspd',
+    'wind_gust_kt': 'wgst',
+    'visibility_statute_mi': 'visib',
+    'wx_string': 'wxString',
+    'metar_type': 'metarType',
+    'latitude': 'lat',
+    'longitude': 'lon',
+    'elevation_m': 'elev',
+}
+NUMERIC_FIELDS = {'temp', 'dewp', 'wdir', 'wspd', 'wgst', 'lat', 'lon', 'elev'}
+
+
+def _number(value: str):
+    """Convert a numeric field, keeping non-numeric values such as 'VRB' or '10+'"""
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def _to_api_record(fields: Dict[str, str], clouds: List[Dict]) -> Dict:
+    """Build a JSON-API-shaped METAR record from bulk dataset fields"""
+    record = {'mostRecent': 1, 'clouds': clouds}
+
+    for name, api_name in FIELD_MAP.items():
+        value = fields.get(name)
+        if value:
+            record[api_name] = _number(value) if api_name in NUMERIC_FIELDS else value
+
+    observation_time = fields.get('observation_time')
+    if observation_time:
+        record['reportTime'] = observation_time
+        try:
+            record['obsTime'] = int(datetime.fromisoformat(observation_time.replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            pass
+
+    altim = fields.get('altim_in_hg')
+    if altim:
+        try:
+            # The JSON API reports the altimeter in hPa
+            record['altim'] = round(float(altim) * INHG_TO_HPA, 1)
+        except ValueError:
+            pass
+
+    return record
+
+
+def _open_decompressed(stream: BinaryIO) -> BinaryIO:
+    """Wrap a stream in a gzip decompressor if it starts with the gzip magic"""
+    buffered = io.BufferedReader(stream) if not hasattr(stream, 'peek') else stream
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=buffered)
+    return buffered
+
+
+def iter_csv_records(stream: BinaryIO, stations: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """
+    Stream METAR records from the (possibly gzipped) CSV dataset
+
+    The CSV starts with a few status lines before the header row, and
+    repeats the sky_cover / cloud_base_ft_agl columns once per layer.
+    Rows for stations outside `stations` are skipped before any record
+    is built.
+    """
+    text = io.TextIOWrapper(_open_decompressed(stream), encoding='utf-8', newline='')
+    reader = csv.reader(text)
+
+    header = None
+    for row in reader:
+        if row and row[0] == 'raw_text':
+            header = row
+            break
+    if header is None:
+        return
+
+    sky_cover_cols = [i for i, name in enumerate(header) if name == 'sky_cover']
+    station_col = header.index('station_id')
+    columns = list(enumerate(header))
+
+    for row in reader:
+        if len(row) < len(header):
+            continue
+        if stations is not None and row[station_col] not in stations:
+            continue
+
+        fields = {name: row[i] for i, name in columns if name not in ('sky_cover', 'cloud_base_ft_agl')}
+
+        clouds = []
+        for i in sky_cover_cols:
+            cover = row[i]
+            if cover:
+                base = row[i + 1] if i + 1 < len(row) else ''
+                clouds.append({'cover': cover, 'base': int(float(base)) if base else None})
+
+        yield _to_api_record(fields, clouds)
+
+
+def iter_xml_records(stream: BinaryIO, stations: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """Stream METAR records from the (possibly gzipped) XML dataset"""
+    for _, element in ET.iterparse(_open_decompressed(stream), events=('end',)):
+        if element.tag != 'METAR':
+            continue
+
+        fields = {}
+        clouds = []
+        for child in element:
+            if child.tag == 'sky_condition':
+                base = child.get('cloud_base_ft_agl')
+                clouds.append({'cover': child.get('sky_cover'), 'base': int(base) if base else None})
+            elif child.text:
+                fields[child.tag] = child.text
+
+        # Release the parsed element so memory stays bounded by one record
+        element.clear()
+        if stations is None or fields.get('station_id') in stations:
+            yield _to_api_record(fields, clouds)
+
+
+class MeteredStream(io.RawIOBase):
+    def __init__(self, raw: BinaryIO, metrics: CycleMetrics):
+        """
+        Read-through wrapper that counts a response stream's bytes and
+        times each read as the cycle's download stage
+
+        Args:
+            raw: Undecoded response stream (e.g. response.raw)
+            metrics: Cycle metrics to report to
+        """
+        super().__init__()
+        self.raw = raw
+        self.metrics = metrics
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with self.metrics.stage('download'):
+            count = self.raw.readinto(buffer)
+        self.metrics.add_bytes(count or 0)
+        return count
+
+
+class BulkSnapshot:
+    def __init__(self, records: Dict[str, Dict], source: str):
+        """
+        Snapshot of the latest METAR for every station in a bulk dataset
+
+        Args:
+            records: Station ID to JSON-API-shaped METAR record
+            source: URL or path the snapshot was loaded from
+        """
+        self.records = records
+        self.source = source
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, station: str) -> bool:
+        return station in self.records
+
+    def select(self, stations: Iterable[str]) -> List[Dict]:
+        """Return the records for a subset of stations, skipping missing ones"""
+        records = self.records
+        return [records[station] for station in stations if station in records]
+
+    def within(self, bbox: BBox) -> List[Dict]:
+        """Return the records of every station inside a bounding box"""
+        return [record for record in self.records.values()
+                if in_bbox(record.get('lat'), record.get('lon'), bbox)]
+
+
+def load_snapshot(source: str = BULK_CSV_URL, stations: Optional[Iterable[str]] = None,
+                  client: Optional[FetchClient] = None, timeout: int = 30,
+                  metrics: Optional[CycleMetrics] = None) -> BulkSnapshot:
+    """
+    Load a bulk dataset into a snapshot
+
+    Args:
+        source: Dataset URL or local file path (.csv / .xml, optionally .gz)
+        stations: Only keep these stations; keep every station if None
+        client: Pooled HTTP client for URLs (shared client if None)
+        timeout: Request timeout in seconds
+        metrics: Cycle metrics the download bytes, download time and parse
+                 time are reported to (None to report nothing)
+
+    Returns:
+        BulkSnapshot of the latest record per station
+    """
+    parse = iter_xml_records if '.xml' in source.lower() else iter_csv_records
+    wanted = set(stations) if stations is not None else None
+
+    def collect(stream: BinaryIO) -> Dict[str, Dict]:
+        records = {}
+        for record in parse(stream, wanted):
+            station_id = record.get('icaoId')
+            if station_id:
+                records[station_id] = record
+        return records
+
+    if source.startswith(('http://', 'https://')):
+        client = client or get_client()
+        response = client.get(source, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+
+            # Keep the raw stream open at EOF so the gzip/io wrappers can finish
+            response.raw.auto_close = False
+            stream = MeteredStream(response.raw, metrics) if metrics else response.raw
+            # Parsing streams with the download; reads are timed as download
+            with metrics.stage('parse') if metrics else nullcontext():
+                records = collect(stream)
+        finally:
+            response.close()
+    else:
+        with open(source, 'rb') as f:
+            records = collect(f)
+
+    return BulkSnapshot(records, source)
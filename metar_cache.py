@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Response cache for aviationweather.gov API requests
+Revalidates stored responses with ETag / Last-Modified so unchanged data
+costs a 304 and no re-parsing
+
+Bodies are streamed: the parser consumes chunks as they arrive while they
+are written to disk, so the full body is never held in memory.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from metar_http import FetchClient, get_client, requests
+from metar_stream import CHUNK_SIZE, iter_file_chunks
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.metar_cache')
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: int = 3 * 60 * 60,
+                 client: Optional[FetchClient] = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory for stored response bodies and validators
+            ttl_seconds: How long a stored response may be revalidated before
+                         it is discarded and fetched in full again
+            client: Pooled HTTP client (shared process-wide client if None)
+        """
+        self.cache_dir = cache_dir
+        self._client = client
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.last_hit = False
+        # Body bytes downloaded by the last fetch (0 for a 304)
+        self.last_bytes = 0
+
+        # Parsed results of stored bodies, so a 304 skips parsing entirely
+        self._parsed: Dict[str, Any] = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def client(self) -> FetchClient:
+        """HTTP client, created on first use so `requests` is imported by the first fetch"""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    @client.setter
+    def client(self, client: FetchClient):
+        self._client = client
+
+    def _key(self, url: str, params: Dict) -> str:
+        """Build a stable cache key from the request URL and parameters"""
+        query = '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        return hashlib.sha1(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        """Return the (metadata, body) file paths for a cache key"""
+        return (os.path.join(self.cache_dir, f"{key}.json"),
+                os.path.join(self.cache_dir, f"{key}.body"))
+
+    def _load_meta(self, key: str) -> Optional[Dict]:
+        """Load validators for a key, dropping the entry if it has expired"""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - meta.get('stored_at', 0) > self.ttl_seconds or not os.path.exists(body_path):
+            self._discard(key)
+            return None
+
+        return meta
+
+    def _discard(self, key: str):
+        """Remove a stored entry"""
+        self._parsed.pop(key, None)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write a file so readers never see a partial body"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store(self, key: str, response: 'requests.Response', body_tmp_path: str):
+        """Persist a fully received response body with its validators"""
+        meta_path, body_path = self._paths(key)
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time()
+        }
+        os.replace(body_tmp_path, body_path)
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def _tee(self, response: 'requests.Response', f) -> Iterator[bytes]:
+        """Yield body chunks while copying them to an open file"""
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            self.last_bytes += len(chunk)
+            f.write(chunk)
+            yield chunk
+
+    def _touch(self, key: str, meta: Dict):
+        """Restart the TTL of an entry the server confirmed is unchanged"""
+        meta_path, _ = self._paths(key)
+        meta['stored_at'] = time.time()
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def fetch(self, url: str, params: Dict, parse: Callable[[Iterable[bytes]], Any], timeout: int = 15,
+              revalidate: bool = True) -> Any:
+        """
+        Fetch a URL with conditional-GET revalidation
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            parse: Function turning an iterable of body chunks into the value to return
+            timeout: Request timeout in seconds
+            revalidate: Send the stored validators (False to force a full response)
+
+        Returns:
+            The parsed value, reused from memory or disk on a 304
+
+        Raises:
+            requests.HTTPError: Error status, or a 304 with nothing stored to reuse
+        """
+        key = self._key(url, params)
+        meta = self._load_meta(key) if revalidate else None
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        self.last_bytes = 0
+        with self.client.get(url, params=params, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                if meta is None:
+                    # Validators were not sent, so there is no entry the 304 can refer to
+                    raise requests.HTTPError(f"304 Not Modified for {response.url} with no cached "
+                                             f"response to reuse", response=response)
+
+                if key not in self._parsed:
+                    # First 304 since startup - parse the stored body once
+                    _, body_path = self._paths(key)
+                    try:
+                        self._parsed[key] = parse(iter_file_chunks(body_path))
+                    except (OSError, ValueError) as e:
+                        # Stored body deleted or corrupt - fetch it again in full
+                        print(f"Cached response unusable ({e}) - fetching it again")
+                        self._discard(key)
+                        response.close()
+                        return self.fetch(url, params, parse, timeout, revalidate=False)
+
+                self.hits += 1
+                self.last_hit = True
+                self._touch(key, meta)
+                return self._parsed[key]
+
+            response.raise_for_status()
+            self.misses += 1
+            self.last_hit = False
+
+            _, body_path = self._paths(key)
+            body_tmp_path = f"{body_path}.tmp"
+            try:
+                with open(body_tmp_path, 'wb') as f:
+                    chunks = self._tee(response, f)
+                    parsed = parse(chunks)
+
+                    # Finish the copy if the parser stopped before the end
+                    for _ in chunks:
+                        pass
+
+                if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+                    self._store(key, response, body_tmp_path)
+                    self._parsed[key] = parsed
+                else:
+                    # Nothing to revalidate with - don't keep a stale copy around
+                    self._discard(key)
+            finally:
+                if os.path.exists(body_tmp_path):
+                    os.remove(body_tmp_path)
+
+        return parsed
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters"""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Flight category classification shared by the scraper and the LED maps
+Scalar helpers for single stations and a batch API that classifies whole
+arrays of visibility / ceiling values at once (vectorized with NumPy when
+it is installed, plain Python otherwise)
+
+Flight Categories:
+- VFR: Ceiling > 3000 ft AND Visibility > 5 mi
+- MVFR: Ceiling 1000-3000 ft OR Visibility 3-5 mi
+- IFR: Ceiling 500-999 ft OR Visibility 1-3 mi
+- LIFR: Ceiling < 500 ft OR Visibility < 1 mi
+- UNKNOWN: Neither visibility nor ceiling reported
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from metar_lazy import lazy_import
+
+# Only imported once a batch is large enough to use it
+np = lazy_import('numpy', optional=True)
+
+# Below this many items the plain Python paths are as fast as NumPy, so
+# small maps never pay for importing it
+NUMPY_MIN_BATCH = 128
+
+def use_numpy(count: int) -> bool:
+    """True if a batch of `count` items should be vectorized (imports NumPy on first use)"""
+    return np is not None and count >= NUMPY_MIN_BATCH and np.available()
+
+
+# One-byte category codes
+VFR, MVFR, IFR, LIFR, UNKNOWN = range(5)
+CATEGORIES = ('VFR', 'MVFR', 'IFR', 'LIFR', 'UNKNOWN')
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+
+# Ceiling used when no BKN/OVC layer is reported (clear skies)
+NO_CEILING = 9999
+
+# Cloud covers that form a ceiling
+CEILING_COVERS = ('BKN', 'OVC', 'OVX', 'VV')
+
+
+def parse_visibility(visib_str, missing: Optional[float] = None) -> Optional[float]:
+    """
+    Parse visibility string to numeric value in statute miles
+
+    Handles API values ("10+", "3", "1/2") and raw METAR tokens ("1 1/2SM",
+    "M1/4SM", "P6SM"). "M" (less than) and "P" (more than) qualifiers are
+    dropped, which keeps the value on the right side of every category
+    threshold.
+
+    Args:
+        visib_str: Visibility value or token
+        missing: Value returned when no visibility is reported or it cannot
+                 be parsed (None so missing data is not mistaken for good
+                 visibility)
+    """
+    if visib_str is None or visib_str == '':
+        return missing
+
+    if isinstance(visib_str, (int, float)):
+        return float(visib_str)
+
+    visib_str = str(visib_str).strip().upper()
+    if visib_str.endswith('SM'):
+        visib_str = visib_str[:-2]
+
+    # Handle "10+" / "6+" and the raw-text "P6" / "M1/4" qualifiers
+    visib_str = visib_str.rstrip('+').lstrip('PM')
+
+    total = 0.0
+    try:
+        # Handle mixed numbers like "1 1/2" and fractions like "3/4"
+        for part in visib_str.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += float(numerator) / float(denominator)
+            else:
+                total += float(part)
+    except (ValueError, ZeroDivisionError):
+        return missing
+
+    return total if visib_str else missing
+
+
+def parse_ceiling(clouds: List[Dict]) -> Optional[int]:
+    """Extract ceiling height from clouds data"""
+    if not clouds:
+        return None
+
+    # Look for overcast (OVC), broken (BKN) or obscured (VV, "OVX" in the API) layers
+    for cloud in clouds:
+        cover = (cloud.get('cover') or '').upper()
+        if cover in CEILING_COVERS and cloud.get('base') is not None:
+            return int(cloud.get('base'))
+
+    return None  # No ceiling found
+
+
+def flight_category(visibility: Optional[float], ceiling: Optional[int]) -> str:
+    """
+    Calculate flight category based on visibility and ceiling
+
+    A missing visibility (None or NaN) leaves the ceiling alone to decide
+    the category. With neither reported there is nothing to go on, and the
+    category is UNKNOWN rather than VFR.
+    """
+    # NaN != NaN: treat NaN from array inputs as missing
+    visibility_missing = visibility is None or visibility != visibility
+    ceiling_missing = ceiling is None or ceiling != ceiling
+    if visibility_missing and ceiling_missing:
+        return 'UNKNOWN'
+
+    # Use high ceiling if no ceiling reported (clear skies)
+    ceiling_ft = NO_CEILING if ceiling_missing else ceiling
+    if visibility_missing:
+        visibility = float('inf')
+
+    if ceiling_ft < 500 or visibility < 1:
+        return 'LIFR'
+    elif ceiling_ft < 1000 or visibility < 3:
+        return 'IFR'
+    elif ceiling_ft <= 3000 or visibility <= 5:
+        return 'MVFR'
+    else:
+        return 'VFR'
+
+
+def classify_batch(visibilities: Sequence[float], ceilings: Sequence[Optional[int]]):
+    """
+    Classify many stations at once
+
+    Gives exactly the same result as flight_category() for each pair.
+
+    Args:
+        visibilities: Visibility in statute miles per station, None (or NaN)
+                      when not reported
+        ceilings: Ceiling in feet per station, None (or NaN) for no ceiling
+
+    Returns:
+        Category codes (indexes into CATEGORIES) - a uint8 NumPy array when
+        NumPy is available and the batch has at least NUMPY_MIN_BATCH
+        stations, otherwise a bytearray
+    """
+    if not use_numpy(len(visibilities)):
+        return bytearray(CATEGORY_CODES[flight_category(v, c)] for v, c in zip(visibilities, ceilings))
+
+    vis = np.asarray(visibilities, dtype=np.float64)
+    ceil = np.asarray(ceilings, dtype=np.float64)
+    no_data = np.isnan(vis) & np.isnan(ceil)
+    # A NaN visibility compares False everywhere below, so it never restricts
+    ceil = np.where(np.isnan(ceil), NO_CEILING, ceil)
+
+    # Apply the least to most restrictive rule so the worst category wins
+    codes = np.full(vis.shape, VFR, dtype=np.uint8)
+    codes[(ceil <= 3000) | (vis <= 5)] = MVFR
+    codes[(ceil < 1000) | (vis < 3)] = IFR
+    codes[(ceil < 500) | (vis < 1)] = LIFR
+    codes[no_data] = UNKNOWN
+    return codes
+
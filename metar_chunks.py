@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Chunked, concurrent fetching for long station lists
+The API takes stations as one comma-separated `ids=` parameter. Hundreds of
+IDs in one query run into URL-length and result-count limits, and one
+failed request loses every station. fetch_chunked() splits the list into
+chunks bounded by ID count and query length, fetches them on a small worker
+pool, merges what arrives and reports the chunks that failed, so a partial
+failure leaves partial data.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+# At most this many IDs per request, keeping each response (up to a few
+# reports per station) well inside the API's result limit
+DEFAULT_MAX_IDS = 100
+# Longest `ids=` value per request, well below common 2-8 KB URL limits
+DEFAULT_MAX_CHARS = 1500
+DEFAULT_MAX_WORKERS = 4
+
+
+class ChunkFailure(NamedTuple):
+    index: int
+    stations: List[str]
+    error: Exception
+
+
+def chunk_ids(station_ids: Iterable[str], max_ids: int = DEFAULT_MAX_IDS,
+              max_chars: int = DEFAULT_MAX_CHARS) -> List[List[str]]:
+    """
+    Split station IDs into request-sized chunks
+
+    Duplicates are dropped (first occurrence kept) and the order is kept.
+
+    Args:
+        station_ids: Station IDs
+        max_ids: Most IDs per chunk
+        max_chars: Longest comma-joined chunk
+
+    Returns:
+        Chunks of IDs, each non-empty
+    """
+    chunks = []
+    chunk: List[str] = []
+    length = 0
+    for station in dict.fromkeys(station_ids):
+        # +1 for the comma joining it to the previous ID
+        added = len(station) + (1 if chunk else 0)
+        if chunk and (len(chunk) >= max_ids or length + added > max_chars):
+            chunks.append(chunk)
+            chunk, length, added = [], 0, len(station)
+        chunk.append(station)
+        length += added
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def fetch_chunked(chunks: List[List[str]], fetch: Callable[[List[str]], Dict],
+                  max_workers: int = DEFAULT_MAX_WORKERS) -> Tuple[Dict, List[ChunkFailure]]:
+    """
+    Fetch every chunk and merge the results
+
+    Args:
+        chunks: Chunks of station IDs, as from chunk_ids()
+        fetch: Fetches one chunk, returning station -> data; raises on failure
+        max_workers: Most requests in flight at once
+
+    Returns:
+        (merged station -> data, failed chunks in chunk order)
+    """
+    if not chunks:
+        return {}, []
+    if len(chunks) == 1:
+        # Nothing to overlap - skip the pool
+        try:
+            return fetch(chunks[0]), []
+        except Exception as e:
+            return {}, [ChunkFailure(0, chunks[0], e)]
+
+    results: List[Dict] = [{}] * len(chunks)
+    failures = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = {executor.submit(fetch, chunk): index for index, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                failures.append(ChunkFailure(index, chunks[index], e))
+
+    # Merge in chunk order, so the result keeps the requested station order
+    merged: Dict = {}
+    for result in results:
+        merged.update(result)
+    failures.sort(key=lambda failure: failure.index)
+    return merged, failures
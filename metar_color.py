@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Color pipeline for the LED strips
+Category colors are defined once, as true (R, G, B). A ColorPipeline turns
+them into the bytes a strip expects: gamma-corrected, scaled by brightness
+and in the strip's wire channel order. This is the only place where channel
+order is handled.
+
+The output bytes for every category at every animation level are
+precomputed, so composing a frame is a table lookup per LED. The whole frame
+is built as one bytearray and handed to the pixel backend in a single
+write(). Per-level frames, blends and diffs of long strips use NumPy when it
+is installed; short strips never import it.
+
+The boards' strips take their bytes in RGB order. The NeoPixel driver
+defaults to GRB, which is why colors used to be stored with red and green
+swapped.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from metar_category import CATEGORIES, use_numpy
+from metar_lazy import lazy_import
+
+# Only imported once a batch is large enough to use it
+np = lazy_import('numpy', optional=True)
+
+Color = Tuple[int, int, int]
+
+# Category colors, (R, G, B)
+CATEGORY_COLORS: Dict[str, Color] = {
+    'VFR': (0, 255, 0),  # Green
+    'MVFR': (0, 0, 255),  # Blue
+    'IFR': (255, 0, 0),  # Red
+    'LIFR': (255, 0, 255),  # Magenta
+    'UNKNOWN': (128, 128, 128),  # Dim white for errors
+}
+
+# Code for LEDs with no station; follows the category codes
+OFF_CODE = len(CATEGORIES)
+
+DEFAULT_CHANNEL_ORDER = 'RGB'
+DEFAULT_GAMMA = 2.2
+
+LEVEL_MAX = 255
+LEVELS = LEVEL_MAX + 1
+
+
+class ColorPipeline:
+    def __init__(self, channel_order: str = DEFAULT_CHANNEL_ORDER, brightness: float = 1.0,
+                 gamma: float = DEFAULT_GAMMA, colors: Dict[str, Color] = CATEGORY_COLORS):
+        """
+        Precompute the strip bytes for every category and animation level
+
+        Args:
+            channel_order: Order the strip expects its bytes in, e.g. 'RGB' or 'GRB'
+            brightness: Strip brightness 0.0-1.0, applied after gamma
+            gamma: Gamma exponent (1.0 for none)
+            colors: Category name to (R, G, B)
+        """
+        if sorted(channel_order.upper()) != ['B', 'G', 'R']:
+            raise ValueError(f"Unsupported channel order '{channel_order}'")
+
+        self.channel_order = channel_order.upper()
+        self.brightness = brightness
+        self.gamma = gamma
+        self.colors = dict(colors)
+
+        # Source channel for each output byte
+        self.order = tuple('RGB'.index(c) for c in self.channel_order)
+
+        # Input level 0-255 -> gamma-corrected, brightness-scaled output byte
+        self.gamma_table = bytes(min(LEVEL_MAX, round(LEVEL_MAX * (i / LEVEL_MAX) ** gamma * brightness))
+                                 for i in range(LEVELS))
+
+        # levels[code] holds the 3 output bytes for each animation level 0-255
+        rgbs = [self.colors.get(name, self.colors['UNKNOWN']) for name in CATEGORIES] + [(0, 0, 0)]
+        self.levels: List[bytes] = [b''.join(self.encode(rgb, level) for level in range(LEVELS))
+                                    for rgb in rgbs]
+        # Full-level bytes per code
+        self.full: List[bytes] = [table[LEVEL_MAX * 3:] for table in self.levels]
+        # NumPy view of the level tables, built the first time a long strip needs it
+        self._level_array = None
+
+    @classmethod
+    def for_backend(cls, backend: str, channel_order: str = DEFAULT_CHANNEL_ORDER,
+                    brightness: float = 1.0, gamma: float = DEFAULT_GAMMA) -> 'ColorPipeline':
+        """
+        Build the pipeline for a pixel backend
+
+        A terminal is already a gamma-encoded display, so it gets the colors
+        unchanged; LED backends get gamma and brightness.
+        """
+        if backend == 'terminal':
+            return cls(channel_order, brightness=1.0, gamma=1.0)
+        return cls(channel_order, brightness=brightness, gamma=gamma)
+
+    def encode(self, rgb: Color, level: int = LEVEL_MAX) -> bytes:
+        """Strip bytes for an (R, G, B) color dimmed to level/255"""
+        table = self.gamma_table
+        return bytes(table[rgb[source] * level // LEVEL_MAX] for source in self.order)
+
+    def pixel(self, code: int, level: int = LEVEL_MAX) -> bytes:
+        """Precomputed strip bytes for a category code at an animation level"""
+        return self.levels[code][level * 3:level * 3 + 3]
+
+    def compose(self, codes: Sequence[int], levels: Optional[Sequence[int]] = None) -> bytearray:
+        """
+        Build a whole frame from one category code per LED
+
+        Args:
+            codes: Category code (or OFF_CODE) for every LED on the strip
+            levels: Animation level 0-255 per LED (full level if None)
+
+        Returns:
+            Strip bytes, 3 per LED
+        """
+        if levels is not None:
+            if use_numpy(len(codes)):
+                if self._level_array is None:
+                    self._level_array = np.frombuffer(b''.join(self.levels),
+                                                      dtype=np.uint8).reshape(-1, LEVELS, 3)
+                return bytearray(self._level_array[np.asarray(codes, dtype=np.intp),
+                                                   np.asarray(levels, dtype=np.intp)].tobytes())
+            tables = self.levels
+            return bytearray(b''.join([tables[code][level * 3:level * 3 + 3]
+                                       for code, level in zip(codes, levels)]))
+        # Joining the precomputed bytes beats a NumPy gather at every strip
+        # length, since the codes arrive as a Python list
+        full = self.full
+        return bytearray(b''.join([full[code] for code in codes]))
+
+    def solid(self, rgb: Color, led_count: int) -> bytearray:
+        """A frame with every LED set to one (R, G, B) color"""
+        return bytearray(self.encode(rgb) * led_count)
+
+
+def blend(old: bytes, new: bytes, weight: int) -> bytearray:
+    """Mix two frames byte by byte, weight 0 (old) to 255 (new)"""
+    if use_numpy(len(new) // 3):
+        start = np.frombuffer(old, dtype=np.uint8).astype(np.uint16)
+        target = np.frombuffer(new, dtype=np.uint8).astype(np.uint16)
+        return bytearray(((start * (LEVEL_MAX - weight) + target * weight) // LEVEL_MAX)
+                         .astype(np.uint8).tobytes())
+    inverse = LEVEL_MAX - weight
+    return bytearray((a * inverse + b * weight) // LEVEL_MAX for a, b in zip(old, new))
+
+
+def count_changed(old: bytes, new: bytes) -> int:
+    """Number of 3-byte pixels that differ between two frames"""
+    if use_numpy(len(new) // 3):
+        a = np.frombuffer(old, dtype=np.uint8).reshape(-1, 3)
+        b = np.frombuffer(new, dtype=np.uint8).reshape(-1, 3)
+        return int(np.count_nonzero((a != b).any(axis=1)))
+    return sum(1 for i in range(0, len(new), 3) if old[i:i + 3] != new[i:i + 3])
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Raw METAR text decoder
+Turns raw reports (the API's rawOb, or the plain-text feed) into
+visibility, cloud layers including VV vertical visibility, ceiling, wind,
+present weather, temperature and altimeter in one pass over the report's
+tokens, so the map can work from raw-text feeds and archives without the
+JSON decoration. Each token is classified by one compiled regex and the
+result memoized, since feeds repeat the same tokens across stations.
+"""
+
+import codecs
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metar_category import parse_visibility
+
+HEADER_RE = re.compile(r'(?:(?P<type>METAR|SPECI)\s+)?(?P<station>[A-Z0-9]{3,4})\s+(?P<time>\d{6})Z\b', re.ASCII)
+
+# Every body group a report can contain, matched one whitespace-delimited
+# token at a time. A mixed-number visibility ("1 1/2SM") arrives as a
+# whole-number token followed by a fraction token.
+TOKEN_RE = re.compile(r"""
+    (?P<wind>(?P<wdir>\d{3}|VRB)(?P<wspd>\d{2,3})(?:G(?P<wgst>\d{2,3}))?(?P<wunit>KT|MPS))
+  | (?P<visibility>(?P<vis>[MP]?\d{1,2}(?:/\d{1,2})?SM)|(?P<meters>\d{4})(?:NDV)?|CAVOK)
+  | (?P<whole>\d{1,2})
+  | (?P<sky>(?:FEW|SCT|BKN|OVC|VV)(?:\d{3}|///)(?:CB|TCU|///)?|SKC|CLR|NSC|NCD)
+  | (?P<temps>(?P<temp>M?\d{2})/(?P<dewp>M?\d{2})?)
+  | (?P<pressure>A(?P<inhg>\d{4})|Q(?P<hpa>\d{4}))
+  | (?P<wx>(?:[-+]|VC)?(?:(?:MI|PR|BC|DR|BL|SH|TS|FZ)(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP)*
+        |(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)+))
+  | (?P<rmk>RMK)
+""", re.VERBOSE | re.ASCII)
+
+# Distinct tokens whose decoded value is memoized; real feeds repeat the
+# same few thousand tokens, so most lookups skip the regex entirely
+TOKEN_CACHE_SIZE = 16384
+
+KT_PER_MPS = 1.94384
+INHG_TO_HPA = 33.8639
+METERS_PER_MILE = 1609.344
+
+# Sky covers that are cloud layers (SKC/CLR/NSC/NCD report no layers)
+CLOUD_COVERS = ('FEW', 'SCT', 'BKN', 'OVC')
+
+
+def _signed(value: str) -> int:
+    """Convert a METAR temperature such as 'M05' to an int"""
+    return -int(value[1:]) if value.startswith('M') else int(value)
+
+
+class DecodedMetar:
+    """Fields decoded from one raw METAR"""
+
+    __slots__ = ('raw', 'station', 'time', 'metar_type', 'wind_dir', 'wind_speed', 'wind_gust',
+                 'visibility_mi', 'clouds', 'vertical_visibility_ft', 'weather', 'temp',
+                 'dewp', 'altimeter_hpa')
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.station: Optional[str] = None
+        self.time: Optional[str] = None
+        self.metar_type = 'METAR'
+        self.wind_dir = None  # Degrees, or 'VRB'
+        self.wind_speed: Optional[int] = None
+        self.wind_gust: Optional[int] = None
+        self.visibility_mi: Optional[float] = None
+        self.clouds: List[Tuple[str, Optional[int]]] = []
+        self.vertical_visibility_ft: Optional[int] = None
+        self.weather: List[str] = []
+        self.temp: Optional[int] = None
+        self.dewp: Optional[int] = None
+        self.altimeter_hpa: Optional[float] = None
+
+    @property
+    def ceiling_ft(self) -> Optional[int]:
+        """Lowest BKN/OVC layer or vertical visibility, None if unlimited"""
+        for cover, base in self.clouds:
+            if cover in ('BKN', 'OVC') and base is not None:
+                return base
+        return self.vertical_visibility_ft
+
+    def to_api_record(self) -> Dict:
+        """Return the fields in the JSON API's METAR record shape"""
+        clouds = [{'cover': cover, 'base': base} for cover, base in self.clouds]
+        observed = obs_epoch(self.time) if self.time else None
+        if self.vertical_visibility_ft is not None:
+            clouds.append({'cover': 'OVX', 'base': self.vertical_visibility_ft})
+
+        return {
+            'icaoId': self.station,
+            'mostRecent': 1,
+            'rawOb': self.raw,
+            'obsTime': observed,
+            'reportTime': (datetime.fromtimestamp(observed, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+                           if observed is not None else None),
+            'metarType': self.metar_type,
+            'wdir': self.wind_dir,
+            'wspd': self.wind_speed,
+            'wgst': self.wind_gust,
+            'visib': self.visibility_mi,
+            'clouds': clouds,
+            'wxString': ' '.join(self.weather) or None,
+            'temp': self.temp,
+            'dewp': self.dewp,
+            'altim': self.altimeter_hpa,
+        }
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _token(token: str) -> Tuple[Optional[str], Any]:
+    """
+    Classify and decode one report token
+
+    Returns:
+        (kind, value) where kind is a TOKEN_RE group name (None if the token
+        is not recognized) and value is:
+            wind: (direction or 'VRB', speed kt, gust kt or None)
+            visibility: statute miles
+            whole: int (first half of a mixed-number visibility)
+            sky: (cover, base ft or None), cover 'VV' for vertical visibility
+            temps: (temp C, dewpoint C or None)
+            pressure: altimeter hPa
+            wx / rmk: the token itself
+    """
+    match = TOKEN_RE.fullmatch(token)
+    if match is None:
+        return None, None
+
+    kind = match.lastgroup
+    if kind == 'wind':
+        wdir, wspd, wgst, unit = match.group('wdir', 'wspd', 'wgst', 'wunit')
+        scale = KT_PER_MPS if unit == 'MPS' else 1
+        value = (wdir if wdir == 'VRB' else int(wdir), round(int(wspd) * scale),
+                 round(int(wgst) * scale) if wgst else None)
+    elif kind == 'visibility':
+        vis, meters = match.group('vis', 'meters')
+        if vis:
+            value = parse_visibility(vis)
+        elif meters and meters != '9999':
+            value = round(int(meters) / METERS_PER_MILE, 2)
+        else:
+            value = 10.0  # 9999 (10 km or more) or CAVOK
+    elif kind == 'whole':
+        value = int(token)
+    elif kind == 'sky':
+        cover = token[:2] if token.startswith('VV') else token[:3]
+        base = token[len(cover):len(cover) + 3]
+        value = (cover, int(base) * 100 if base.isdigit() else None)
+    elif kind == 'temps':
+        temp, dewp = match.group('temp', 'dewp')
+        value = (_signed(temp), _signed(dewp) if dewp else None)
+    elif kind == 'pressure':
+        inhg, hpa = match.group('inhg', 'hpa')
+        value = round(int(inhg) * INHG_TO_HPA / 100, 1) if inhg else float(hpa)
+    else:
+        value = token
+
+    return kind, value
+
+
+def decode(raw: str) -> DecodedMetar:
+    """
+    Decode one raw METAR report
+
+    Remarks (everything after RMK) are ignored. Groups may appear in any
+    order, and unrecognized tokens are skipped rather than treated as errors.
+    """
+    metar = DecodedMetar(raw)
+
+    header = HEADER_RE.match(raw)
+    if header:
+        metar_type, metar.station, metar.time = header.groups()
+        if metar_type:
+            metar.metar_type = metar_type
+        raw = raw[header.end():]
+
+    whole = None
+    for token in raw.split():
+        kind, value = _token(token)
+
+        if kind == 'sky':
+            if value[0] == 'VV':
+                metar.vertical_visibility_ft = value[1]
+            elif value[0] in CLOUD_COVERS:
+                metar.clouds.append(value)
+        elif kind == 'wx':
+            metar.weather.append(value)
+        elif kind == 'visibility':
+            # "1 1/2SM": add the whole-number token that preceded the fraction
+            metar.visibility_mi = value + whole if whole is not None and '/' in token else value
+        elif kind == 'wind':
+            metar.wind_dir, metar.wind_speed, metar.wind_gust = value
+        elif kind == 'temps':
+            metar.temp, metar.dewp = value
+        elif kind == 'pressure':
+            metar.altimeter_hpa = value
+        elif kind == 'rmk':
+            break
+
+        whole = value if kind == 'whole' else None
+
+    return metar
+
+
+def obs_epoch(day_time: str, now: Optional[float] = None) -> int:
+    """
+    Convert a METAR ddhhmm observation time to a Unix timestamp
+
+    The report only carries the day of month, so the month is taken as the
+    latest one that does not put the observation in the future.
+    """
+    current = datetime.fromtimestamp(now if now is not None else time.time(), timezone.utc)
+    day, hour, minute = int(day_time[:2]), int(day_time[2:4]), int(day_time[4:6])
+
+    month_start = current.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(3):
+        try:
+            observed = month_start.replace(day=day, hour=hour, minute=minute)
+        except ValueError:
+            observed = None  # Day does not exist in this month
+        if observed is not None and observed <= current + timedelta(hours=1):
+            return int(observed.timestamp())
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
+
+    return int(current.timestamp())
+
+
+def _newer(time_a: str, time_b: str) -> bool:
+    """True if METAR time ddhhmm `time_a` is later than `time_b` (handles month rollover)"""
+    day_a, day_b = int(time_a[:2]), int(time_b[:2])
+    if abs(day_a - day_b) > 15:
+        return day_a < day_b
+    return time_a > time_b
+
+
+def decode_feed(lines: Iterable[str]) -> Dict[str, DecodedMetar]:
+    """
+    Decode a raw-text feed (one report per line), keeping each station's latest
+
+    Args:
+        lines: Raw METAR lines
+
+    Returns:
+        Station ID to its most recent decoded report
+    """
+    latest: Dict[str, DecodedMetar] = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        metar = decode(line)
+        if metar.station is None:
+            continue
+
+        current = latest.get(metar.station)
+        if current is None or (metar.time and current.time and _newer(metar.time, current.time)):
+            latest[metar.station] = metar
+
+    return latest
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield text lines from a raw-text response body as it streams in"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        yield from lines
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
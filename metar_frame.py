@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Frame buffer for the LED strip
+Frames are bytearrays of strip bytes (3 per LED, already in the strip's
+channel order, see metar_color.py). The buffer remembers the last frame
+pushed to the strip, hands each changed frame to the backend in a single
+write(), and skips the write entirely when nothing changed
+"""
+
+from typing import Optional
+
+from metar_color import count_changed
+
+
+class FrameBuffer:
+    def __init__(self, pixels, led_count: int):
+        """
+        Initialize the frame buffer
+
+        Args:
+            pixels: Pixel backend supporting write()
+            led_count: Number of LEDs on the strip
+        """
+        self.pixels = pixels
+        self.led_count = led_count
+
+        # Last frame committed to the strip; None means unknown, so the next
+        # commit always writes
+        self.committed: Optional[bytes] = None
+
+        self.last_changed = 0
+        self.shows = 0
+        self.skipped_shows = 0
+
+    def blank(self) -> bytearray:
+        """Return an all-off frame to compose the next update into"""
+        return bytearray(self.led_count * 3)
+
+    def changed(self, frame: bytes) -> int:
+        """Return the number of pixels that differ from the committed frame"""
+        if self.committed is None:
+            return self.led_count
+        if frame == self.committed:
+            return 0
+        return count_changed(self.committed, frame)
+
+    def commit(self, frame: bytes) -> int:
+        """
+        Write a frame to the strip
+
+        The whole frame goes to the backend in one write, and the write is
+        skipped when the frame is identical to the last one.
+
+        Returns:
+            Number of pixels that changed
+        """
+        if len(frame) != self.led_count * 3:
+            raise ValueError(f"Frame is {len(frame)} bytes, expected {self.led_count * 3}")
+
+        changed = self.changed(frame)
+        if changed:
+            self.pixels.write(frame)
+            self.committed = bytes(frame)
+            self.shows += 1
+        else:
+            self.skipped_shows += 1
+
+        self.last_changed = changed
+        return changed
+
+    def clear(self):
+        """Turn every LED off and remember the strip as blank"""
+        blank = self.blank()
+        self.pixels.write(blank)
+        self.committed = bytes(blank)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for all METAR fetchers
+Keeps one requests.Session with a keep-alive connection pool so repeated
+fetches reuse the DNS lookup, TCP connection and TLS session
+"""
+
+from typing import Dict, Optional, Tuple, Union
+
+from metar_lazy import lazy_import
+
+# Imported by the first client, usually in the fetch thread
+requests = lazy_import('requests')
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class FetchClient:
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 8,
+                 connect_timeout: float = 5, read_timeout: float = 15):
+        """
+        Initialize the pooled client
+
+        Args:
+            pool_connections: Number of hosts to keep connection pools for
+            pool_maxsize: Connections kept open per host
+            connect_timeout: Default seconds to wait for a connection
+            read_timeout: Default seconds to wait for response data
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'metar-map'
+
+        from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            timeout: Optional[Timeout] = None, stream: bool = False) -> 'requests.Response':
+        """
+        Send a GET request over the pooled session
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            headers: Extra request headers
+            timeout: Seconds, or (connect, read) tuple; client default if None
+            stream: Leave the body unread so it can be consumed incrementally
+
+        Returns:
+            The requests.Response
+        """
+        return self.session.get(url, params=params, headers=headers,
+                                timeout=timeout if timeout is not None else self.timeout,
+                                stream=stream)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_client: Optional[FetchClient] = None
+
+
+def get_client() -> FetchClient:
+    """Return the process-wide client, creating it with defaults on first use"""
+    global _client
+    if _client is None:
+        _client = FetchClient()
+    return _client
+
+
+def configure_client(**kwargs) -> FetchClient:
+    """Replace the process-wide client with one built from kwargs"""
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = FetchClient(**kwargs)
+    return _client
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Deferred imports
+requests, NumPy and the hardware drivers take a noticeable share of cold
+start on a Raspberry Pi. Modules bind them through lazy_import() so the
+import runs on first attribute access - typically in the fetch thread while
+the main thread is already painting the strip - instead of at startup.
+"""
+
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        """
+        Stand-in that imports the named module on first attribute access
+
+        Args:
+            name: Dotted module name
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """True once the real module has been imported"""
+        return self._module is not None
+
+    def available(self) -> bool:
+        """Import the module if not done yet; False if the import failed"""
+        if self._module is None and not self._failed:
+            try:
+                self._load()
+            except ImportError as e:
+                # e.g. NumPy installed without the libraries it links against
+                print(f"Could not import {self._name}: {e}")
+                self._failed = True
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str, optional: bool = False) -> Optional[LazyModule]:
+    """
+    Bind a module without importing it yet
+
+    Args:
+        name: Dotted module name
+        optional: Return None instead of raising when the module is not
+                  installed (checked without importing it); check
+                  available() before first use in case it fails to import
+
+    Returns:
+        A LazyModule, or None for a missing optional module
+    """
+    try:
+        found = importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        found = False
+    if not found:
+        if optional:
+            return None
+        raise ImportError(f"No module named '{name}'")
+    return LazyModule(name)
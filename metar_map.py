@@ -0,0 +1,1199 @@
+#!/usr/bin/env python3
+"""
+Simple Aviation Weather Map using NeoPixel library
+Displays flight categories on NeoPixel LEDs using aviationweather.gov API
+Drives any number of region maps from one batched fetch; each region is
+described by a profile in regions/ (station to LED mapping, pin, LED count)
+"""
+
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from metar_animate import GUST, STORM, Animator
+from metar_archive import DEFAULT_ARCHIVE_PATH, ObservationArchive
+from metar_bulk import BULK_CSV_URL, load_snapshot
+from metar_cache import DEFAULT_CACHE_DIR, ResponseCache
+from metar_decode import decode, decode_feed, iter_lines
+from metar_category import (CATEGORY_CODES, UNKNOWN, classify_batch, flight_category, parse_ceiling,
+                             parse_visibility)
+from metar_color import CATEGORY_COLORS, DEFAULT_CHANNEL_ORDER, DEFAULT_GAMMA, OFF_CODE, ColorPipeline
+from metar_frame import FrameBuffer
+from metar_http import requests
+from metar_lazy import lazy_import
+from metar_metrics import CycleMetrics
+from metar_pixels import BACKENDS, create_backend
+from metar_records import WeatherRecord
+from metar_stream import iter_metar_records
+from metar_schedule import PollScheduler
+from metar_spatial import BBox, GridIndex, assign_nearest, bbox_param, in_bbox, led_positions, parse_bbox, union_bbox
+from metar_state import DEFAULT_MAX_AGE_SECONDS, StateFile, age_level
+from metar_stations import DEFAULT_REFRESH_DAYS, STATIONS_FILE_NAME, StationIndex, StationTable
+
+# Only the async run mode needs the event loop
+asyncio = lazy_import('asyncio')
+
+REGIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions')
+
+# Last-known-good state file, kept in the cache directory by default
+STATE_FILE_NAME = 'last_known_good.bin'
+
+# Wait between attempts to download an outdated station table
+STATION_RETRY_SECONDS = 60 * 60
+
+
+def load_profile(path: str) -> Dict:
+    """
+    Read a region profile
+
+    Args:
+        path: Profile path, or a bare name looked up in regions/
+    """
+    if not os.path.exists(path):
+        path = os.path.join(REGIONS_DIR, f"{path}.json")
+
+    with open(path, 'r') as f:
+        profile = json.load(f)
+
+    profile.setdefault('name', os.path.basename(path))
+    return profile
+
+
+class DaemonCall:
+    def __init__(self, func, *args):
+        """
+        Start a blocking call in a daemon thread
+
+        Unlike asyncio.to_thread, a call that never returns (e.g. a read stuck
+        on a dead connection) does not keep the process alive at exit.
+
+        Args:
+            func: Function to call
+            *args: Arguments passed to it
+        """
+        self.done = threading.Event()
+        self._result = None
+        self._error: Optional[BaseException] = None
+        self._callbacks: List = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, args=(func, args), daemon=True).start()
+
+    def _run(self, func, args):
+        try:
+            self._result = func(*args)
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._lock:
+                self.done.set()
+                callbacks, self._callbacks = self._callbacks, []
+            for callback in callbacks:
+                callback()
+
+    def add_done_callback(self, callback):
+        """Call callback() when the call finishes (on its thread), or now if it already has"""
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def future(self) -> 'asyncio.Future':
+        """Future on the running event loop for the call's result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle():
+            if future.done():
+                return
+            if self._error is not None:
+                future.set_exception(self._error)
+            else:
+                future.set_result(self._result)
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(settle)
+            except RuntimeError:
+                pass  # The event loop has already closed
+
+        self.add_done_callback(notify)
+        return future
+
+    def result(self):
+        """Wait for the call to finish and return its result (or raise its exception)"""
+        self.done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class Region:
+    def __init__(self, name: str, airport_mapping: Dict[str, int], led_count: int = 50,
+                 pin: str = 'D18', brightness: float = 0.3, backend: str = 'neopixel',
+                 channel_order: str = DEFAULT_CHANNEL_ORDER, gamma: float = DEFAULT_GAMMA,
+                 bbox: Optional[BBox] = None, positions: Optional[Dict[int, Tuple[float, float]]] = None,
+                 max_station_km: Optional[float] = None):
+        """
+        Initialize one physical map
+
+        Args:
+            name: Display name of the region
+            airport_mapping: Airport code to LED index
+            led_count: Number of LEDs on this region's strip
+            pin: Board pin driving the strip
+            brightness: Strip brightness 0.0-1.0
+            backend: Pixel backend name
+            channel_order: Order the strip takes its color bytes in
+            gamma: Gamma correction exponent for the LEDs
+            bbox: Fetch every station inside this box (min_lat, min_lon,
+                  max_lat, max_lon) instead of listing them
+            positions: LED index to (lat, lon) on the map; each LED shows the
+                       nearest station reporting inside bbox
+            max_station_km: Leave an LED dark if no station is this close
+        """
+        self.name = name
+        self.airport_mapping = airport_mapping
+        # Stations listed by ID keep their LED; bbox stations fill the rest
+        self.pinned = dict(airport_mapping)
+        self.bbox = bbox
+        self.positions = {led: pos for led, pos in (positions or {}).items()
+                          if led not in set(airport_mapping.values())}
+        self.max_station_km = max_station_km
+        self._assigned_from: Optional[frozenset] = None
+        # Listed codes that can never return a METAR; their LEDs show as
+        # unknown without being requested
+        self.unavailable: Set[str] = set()
+        # Second codes for a listed station (ATL next to KATL) to the ID
+        # whose data they show
+        self.aliases: Dict[str, str] = {}
+        self.led_count = led_count
+        self.pin = pin
+        self.backend = backend
+        self.channel_order = channel_order
+
+        # Precomputed strip bytes per category; brightness and channel order
+        # are applied here, so the driver runs at full brightness
+        self.pipeline = ColorPipeline.for_backend(backend, channel_order, brightness=brightness, gamma=gamma)
+
+        # The strip is opened on first use, so importing its driver overlaps
+        # with the first fetch
+        self._pixels = None
+        self._frame: Optional[FrameBuffer] = None
+
+        # Animation engine driving the frame buffer, if animation is enabled
+        self.animator: Optional[Animator] = None
+
+    @property
+    def pixels(self):
+        """Pixel strip (real NeoPixel, simulated, or terminal), opened on first use"""
+        if self._pixels is None:
+            self._pixels = create_backend(self.backend, self.led_count, brightness=1.0, pin=self.pin,
+                                          channel_order=self.channel_order)
+        return self._pixels
+
+    @property
+    def frame(self) -> FrameBuffer:
+        """Last committed frame, so updates only push pixels that changed"""
+        if self._frame is None:
+            self._frame = FrameBuffer(self.pixels, self.led_count)
+        return self._frame
+
+    def assign_stations(self, weather_data: Dict) -> bool:
+        """
+        Give each LED position the nearest station reporting inside the bbox
+
+        Only reruns when the set of reporting stations changed.
+
+        Returns:
+            True if the assignment changed
+        """
+        if self.bbox is None:
+            return False
+
+        points = [(station, data.get('lat'), data.get('lon')) for station, data in weather_data.items()
+                  if station not in self.pinned and in_bbox(data.get('lat'), data.get('lon'), self.bbox)]
+        stations = frozenset(station for station, _, _ in points)
+        if stations == self._assigned_from:
+            return False
+
+        start = time.perf_counter()
+        assigned = assign_nearest(GridIndex(points), self.positions, self.max_station_km)
+        self.airport_mapping = {**self.pinned, **assigned}
+        self._assigned_from = stations
+        print(f"{self.name}: assigned {len(assigned)} of {len(self.positions)} LEDs to the nearest of "
+              f"{len(points)} stations in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return True
+
+    def resolve_stations(self, index: StationIndex):
+        """Rename listed codes to the IDs the API answers to and flag ones that can't report"""
+        check = index.check_mapping(self.pinned)
+        for code, query_id in check.renamed.items():
+            print(f"{self.name}: {code} is reported as {query_id}")
+        for code, query_id in check.aliases.items():
+            print(f"{self.name}: {code} is the same station as {query_id} - LED {check.mapping[code]} shows its data")
+        for code, reason in check.unavailable.items():
+            print(f"{self.name}: {code} {reason} - not requested")
+
+        self.pinned = check.mapping
+        self.unavailable = set(check.unavailable)
+        self.aliases = check.aliases
+        self.airport_mapping = dict(check.mapping)
+        # Pinned IDs may have changed - redo any nearest-station assignment
+        self._assigned_from = None
+
+    @classmethod
+    def from_file(cls, path: str, backend: str = 'neopixel', led_count: Optional[int] = None) -> 'Region':
+        """
+        Load a region profile
+
+        Profiles are JSON files of the form:
+            {"name": "...", "pin": "D18", "led_count": 50, "brightness": 0.3,
+             "channel_order": "RGB", "gamma": 2.2,
+             "airports": [{"id": "KBOS", "led": 43, "name": "Boston Logan, MA"}, ...]}
+
+        A bounding-box region lists LED map positions instead of (or as well
+        as) airports, and shows the nearest reporting station at each:
+            {"bbox": [41.0, -74.0, 45.3, -69.9], "max_station_km": 40,
+             "leds": [{"led": 0, "lat": 41.63, "lon": -73.88}, ...]}
+
+        Args:
+            path: Profile path, or a bare name looked up in regions/
+            backend: Pixel backend name
+            led_count: Override the profile's LED count
+        """
+        profile = load_profile(path)
+        airport_mapping = {airport['id']: airport['led'] for airport in profile.get('airports', [])}
+        bbox = parse_bbox(profile['bbox']) if profile.get('bbox') else None
+
+        return cls(profile['name'], airport_mapping,
+                   led_count=led_count or profile.get('led_count', 50),
+                   pin=profile.get('pin', 'D18'),
+                   brightness=profile.get('brightness', 0.3),
+                   backend=backend,
+                   channel_order=profile.get('channel_order', DEFAULT_CHANNEL_ORDER),
+                   gamma=profile.get('gamma', DEFAULT_GAMMA),
+                   bbox=bbox,
+                   positions=led_positions(profile.get('leds', [])),
+                   max_station_km=profile.get('max_station_km'))
+
+
+class WeatherMap:
+    def __init__(self, regions: List[Region], cache_dir=DEFAULT_CACHE_DIR, cache_ttl_minutes=180,
+                 bulk_source: Optional[str] = None, raw_feed: bool = False,
+                 archive_path: Optional[str] = None, archive_retention_days: float = 30,
+                 remote_source: Optional[str] = None, animate: bool = False, fps: int = 30,
+                 cpu_budget: float = 0.2, metrics: Optional[CycleMetrics] = None,
+                 state_path: Optional[str] = None, state_max_age_hours: float = DEFAULT_MAX_AGE_SECONDS / 3600,
+                 station_table: Optional[StationTable] = None):
+        """
+        Initialize the weather map for one or more regions
+
+        Args:
+            regions: Region maps to drive
+            cache_dir: Directory for the API response cache
+            cache_ttl_minutes: How long cached responses may be revalidated
+            bulk_source: All-stations dataset URL or local file to read instead
+                         of per-ID API queries (None for per-ID queries)
+            raw_feed: Request the plain-text METAR feed and decode it locally
+                      instead of the larger JSON response
+            archive_path: SQLite file every cycle's observations are appended
+                          to (None to keep no history)
+            archive_retention_days: Days of history kept in the archive
+            remote_source: metar_server.py URL to read weather data from
+                           instead of aviationweather.gov (None to fetch directly)
+            animate: Cross-fade category changes and blink gusts/thunderstorms
+                     (only in the asyncio run mode, which starts the engines)
+            fps: Animation frame rate
+            cpu_budget: Fraction of one CPU core animation may use before the
+                        frame rate is lowered
+            metrics: Per-cycle metrics recorder/exporter (records without
+                     exporting if None)
+            state_path: File the last-known-good state is saved to after each
+                        cycle and repainted from at startup (None to disable)
+            state_max_age_hours: Observations older than this are not repainted
+            station_table: Station metadata airport codes are checked against
+                           before the first fetch (None to send them as listed)
+        """
+        self.regions = regions
+        self.api_url = "https://aviationweather.gov/api/data/metar"
+        self.bulk_source = bulk_source
+        self.raw_feed = raw_feed
+        self.remote_source = remote_source
+
+        # Bounding-box regions place stations by their coordinates, which
+        # the raw feed and the fan-out server don't carry
+        if self.bbox() and (remote_source or (raw_feed and not bulk_source)):
+            raise ValueError("Bounding-box regions need station coordinates - "
+                             "use the JSON API or --bulk, not --raw-feed or --remote")
+
+        # Stage timings, bytes, errors and data age per cycle
+        self.metrics = metrics or CycleMetrics('metar_map')
+        # Weather data currently shown on the LEDs
+        self.displayed: Dict = {}
+
+        # Last-known-good state, so a restart repaints the map before any fetch
+        self.state = StateFile(state_path) if state_path else None
+        self.state_max_age = state_max_age_hours * 3600
+
+        self.station_table = station_table
+        self._station_refresh: Optional[threading.Thread] = None
+        self._station_retry_at = 0.0
+
+        self.animate = animate
+        self.fps = fps
+        self.cpu_budget = cpu_budget
+
+        # Conditional-GET cache so unchanged METARs cost a 304 and no parsing
+        self.cache = ResponseCache(cache_dir, ttl_seconds=cache_ttl_minutes * 60)
+
+        # Optional local history of every observation seen
+        self.archive = (ObservationArchive(archive_path, retention_days=archive_retention_days)
+                        if archive_path else None)
+
+        # Color mapping for flight categories (R, G, B); each region's
+        # pipeline turns these into strip bytes
+        self.colors = CATEGORY_COLORS
+
+    def stations(self) -> List[str]:
+        """
+        Return the deduplicated union of airport codes fetched by ID across all regions
+
+        Bounding-box regions contribute the airports they list (which may lie
+        outside their box), but not the stations assigned from inside it.
+        """
+        stations = {}
+        for region in self.regions:
+            stations.update(dict.fromkeys(code for code in region.pinned
+                                          if code not in region.unavailable and code not in region.aliases))
+        return list(stations)
+
+    def bbox(self) -> Optional[BBox]:
+        """Return the box covering every bounding-box region (None if there are none)"""
+        return union_bbox(region.bbox for region in self.regions if region.bbox is not None)
+
+    def startup_sequence(self, until: Optional[threading.Event] = None):
+        """
+        Run LED startup sequence to test all colors
+
+        Args:
+            until: Stop early once this is set, e.g. when the first weather
+                   data has arrived
+        """
+        print("Running startup sequence...")
+
+        # Test all LEDs with different colors (R, G, B)
+        test_colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)]
+
+        for color in test_colors:
+            for region in self.regions:
+                region.frame.commit(region.pipeline.solid(color, region.led_count))
+            if until is None:
+                time.sleep(0.5)
+            elif until.wait(0.5):
+                print("First fetch finished - cutting the startup sequence short")
+                break
+
+        # Clear all LEDs
+        for region in self.regions:
+            region.frame.clear()
+        print("Startup sequence complete")
+
+    def check_stations(self):
+        """
+        Resolve every region's airport codes against the station table
+
+        Runs before the first fetch with the local table. A missing or
+        outdated table is downloaded in the background instead of holding up
+        the first fetch; the codes are checked again once it arrives.
+        """
+        if not self.station_table:
+            return
+
+        index = self.station_table.load()
+        if index is not None:
+            self._apply_station_index(index)
+        self.refresh_station_table()
+
+    def refresh_station_table(self):
+        """
+        Download a new station table in the background once the local one is outdated
+
+        Called before every fetch, so a map running for weeks picks up the
+        refreshed table; a failed download is retried after
+        STATION_RETRY_SECONDS.
+        """
+        if not self.station_table or (self._station_refresh and self._station_refresh.is_alive()):
+            return
+        if time.monotonic() < self._station_retry_at or not self.station_table.stale():
+            return
+
+        self._station_retry_at = time.monotonic() + STATION_RETRY_SECONDS
+        self._station_refresh = threading.Thread(target=self._download_station_table, daemon=True)
+        self._station_refresh.start()
+
+    def _download_station_table(self):
+        try:
+            index = self.station_table.refresh()
+        except Exception as e:
+            print(f"Could not download the station table: {e}")
+            self.metrics.error('stations')
+            return
+        print(f"Downloaded station table: {len(index)} stations")
+        self._apply_station_index(index)
+
+    def _apply_station_index(self, index: StationIndex):
+        start = time.perf_counter()
+        for region in self.regions:
+            region.resolve_stations(index)
+        checked = sum(len(region.pinned) for region in self.regions)
+        print(f"Checked {checked} airport codes against {len(index)} stations "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def restore_state(self, now: Optional[float] = None) -> bool:
+        """
+        Paint the state saved by the previous run, each station dimmed by its age
+
+        Returns:
+            True if any station was restored
+        """
+        if not self.state:
+            return False
+
+        start = time.perf_counter()
+        saved = self.state.load()
+        if saved is None:
+            return False
+
+        now = now if now is not None else time.time()
+        restored = 0
+        for region in self.regions:
+            codes = [OFF_CODE] * region.led_count
+            levels = [255] * region.led_count
+            for airport, led_index in region.airport_mapping.items():
+                if not 0 <= led_index < region.led_count:
+                    continue
+                station = region.aliases.get(airport, airport)
+                code, obs_time = saved.stations.get(station, (UNKNOWN, 0))
+                age = now - (obs_time or saved.saved_at)
+                if station in saved.stations and age <= self.state_max_age:
+                    codes[led_index] = code
+                    levels[led_index] = age_level(age, self.state_max_age)
+                    restored += 1
+                else:
+                    codes[led_index] = UNKNOWN
+            region.frame.commit(region.pipeline.compose(codes, levels))
+
+        self.metrics.mark_first_paint('restored')
+        print(f"Restored {restored} stations from state saved {(now - saved.saved_at) / 60:.0f} min ago "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return restored > 0
+
+    def save_state(self, weather_data: Dict):
+        """Persist this cycle's categories and observation times for the next restart"""
+        if not self.state:
+            return
+        try:
+            self.state.save(weather_data)
+        except OSError as e:
+            print(f"Could not save state: {e}")
+            self.metrics.error('state')
+
+    def get_weather_data(self, airport_codes: List[str]) -> Dict:
+        """
+        Fetch METAR data for all airports in one API call
+
+        Args:
+            airport_codes: List of airport codes
+
+        Returns:
+            Dictionary with airport codes as keys and weather data as values
+        """
+        with self.metrics.fetch():
+            return self._fetch_weather_data(airport_codes)
+
+    def _metered(self, parse):
+        """Wrap a body parser so its download waits and parse time are recorded"""
+        def metered_parse(chunks):
+            with self.metrics.stage('parse'):
+                return parse(self.metrics.metered(chunks, count_bytes=False))
+        return metered_parse
+
+    def _fetch_weather_data(self, airport_codes: List[str]) -> Dict:
+        """Fetch from the configured source (server, bulk dataset or API)"""
+        if self.remote_source:
+            return self.get_remote_weather_data(airport_codes)
+        if self.bulk_source:
+            return self.get_bulk_weather_data(airport_codes)
+
+        # One query by ID for listed airports, one by area for bbox regions
+        queries = []
+        if airport_codes:
+            # Convert to comma-separated string for API
+            queries.append(({'ids': ','.join(airport_codes)}, f"{len(airport_codes)} airports"))
+        bbox = self.bbox()
+        if bbox:
+            queries.append(({'bbox': bbox_param(bbox)}, f"all stations in {bbox_param(bbox)}"))
+        parse = self._parse_raw_response if self.raw_feed else self._parse_weather_response
+
+        try:
+            weather_data = {}
+            for query, label in queries:
+                params = dict(query, **{
+                    'format': 'raw' if self.raw_feed else 'json',
+                    'taf': 'false',
+                    'hours': 2  # Get data from last 2 hours
+                })
+
+                print(f"Fetching weather data for {label}...")
+                weather_data.update(self.cache.fetch(self.api_url, params, self._metered(parse), timeout=15))
+                self.metrics.add_bytes(self.cache.last_bytes)
+
+                if self.cache.last_hit:
+                    print("Weather data unchanged (304) - reusing cached result")
+            stats = self.cache.stats()
+            print(f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+
+            print(f"Successfully retrieved data for {len(weather_data)} airports")
+            return weather_data
+
+        except requests.RequestException as e:
+            print(f"API request failed: {e}")
+            self.metrics.error('fetch')
+            return {}
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing failed: {e}")
+            self.metrics.error('parse')
+            return {}
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            self.metrics.error('unexpected')
+            return {}
+
+    def get_bulk_weather_data(self, airport_codes: List[str]) -> Dict:
+        """
+        Read weather data for the airports from the all-stations dataset
+
+        Args:
+            airport_codes: List of airport codes
+
+        Returns:
+            Dictionary with airport codes as keys and weather data as values
+        """
+        try:
+            print(f"Loading bulk METAR dataset from {self.bulk_source}...")
+            bbox = self.bbox()
+            snapshot = load_snapshot(self.bulk_source, stations=None if bbox else airport_codes,
+                                     metrics=self.metrics)
+            with self.metrics.stage('parse'):
+                records = snapshot.select(airport_codes)
+                if bbox:
+                    records += snapshot.within(bbox)
+                weather_data = self._weather_from_records(records)
+
+            print(f"Successfully retrieved data for {len(weather_data)} airports")
+            return weather_data
+
+        except requests.RequestException as e:
+            print(f"Bulk download failed: {e}")
+            self.metrics.error('fetch')
+            return {}
+        except Exception as e:
+            print(f"Bulk dataset parsing failed: {e}")
+            self.metrics.error('parse')
+            return {}
+
+    def get_remote_weather_data(self, airport_codes: List[str]) -> Dict:
+        """
+        Read weather data for the airports from a metar_server.py instance
+
+        Args:
+            airport_codes: List of airport codes
+
+        Returns:
+            Dictionary with airport codes as keys and weather data as values
+        """
+        params = {'ids': ','.join(airport_codes)}
+
+        try:
+            print(f"Fetching weather data for {len(airport_codes)} airports from {self.remote_source}...")
+            weather_data = self.cache.fetch(self.remote_source, params, self._metered(self._parse_remote_response),
+                                            timeout=15)
+            self.metrics.add_bytes(self.cache.last_bytes)
+
+            if self.cache.last_hit:
+                print("Weather data unchanged (304) - reusing cached result")
+
+            missing = len(set(airport_codes) - set(weather_data))
+            if missing:
+                print(f"Server has no data for {missing} airports")
+
+            print(f"Successfully retrieved data for {len(weather_data)} airports")
+            return weather_data
+
+        except requests.RequestException as e:
+            print(f"Server request failed: {e}")
+            self.metrics.error('fetch')
+            return {}
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing failed: {e}")
+            self.metrics.error('parse')
+            return {}
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            self.metrics.error('unexpected')
+            return {}
+
+    def _parse_remote_response(self, chunks: Iterable[bytes]) -> Dict:
+        """Parse a metar_server.py response body into per-airport weather data"""
+        stations = json.loads(b''.join(chunks))['stations']
+        return {station: WeatherRecord.from_dict(station, data) for station, data in stations.items()}
+
+    def _parse_weather_response(self, chunks: Iterable[bytes]) -> Dict:
+        """Parse a streamed API response body into per-airport weather data"""
+        return self._weather_from_records(iter_metar_records(chunks))
+
+    def _parse_raw_response(self, chunks: Iterable[bytes]) -> Dict:
+        """Decode a streamed raw-text METAR feed into per-airport weather data"""
+        latest = decode_feed(iter_lines(chunks))
+        return self._weather_from_records(metar.to_api_record() for metar in latest.values())
+
+    def _weather_from_records(self, data: Iterable[Dict]) -> Dict:
+        """Build per-airport weather data from API-shaped METAR records"""
+        weather_data = {}
+
+        # Process each METAR report
+        for metar in data:
+            if metar.get('mostRecent') == 1:  # Only most recent data
+                station_id = metar.get('icaoId')
+                if station_id:
+                    # Fill in fields the record left out from its raw text
+                    if metar.get('visib') is None and metar.get('rawOb'):
+                        for key, value in decode(metar['rawOb']).to_api_record().items():
+                            if not metar.get(key):
+                                metar[key] = value
+
+                    # Flight category is classified below in one batch
+                    weather_data[station_id] = WeatherRecord(
+                        station_id,
+                        visibility_mi=self._parse_visibility(metar.get('visib')),
+                        ceiling_ft=self._parse_ceiling(metar.get('clouds', [])),
+                        temp=metar.get('temp'),
+                        wind_speed=metar.get('wspd'),
+                        wind_gust=metar.get('wgst'),
+                        wx_string=metar.get('wxString'),
+                        report_time=metar.get('reportTime'),
+                        obs_time=metar.get('obsTime'),
+                        metar_type=metar.get('metarType'),
+                        lat=metar.get('lat'),
+                        lon=metar.get('lon')
+                    )
+
+        # Calculate flight categories for every station at once
+        with self.metrics.stage('classify'):
+            records = list(weather_data.values())
+            codes = classify_batch([record.visibility_mi for record in records],
+                                   [record.ceiling_ft for record in records])
+            for record, code in zip(records, codes):
+                record.category_code = int(code)
+
+        return weather_data
+
+    def _parse_visibility(self, visib_str: str) -> Optional[float]:
+        """Parse visibility string to numeric value (None if not reported)"""
+        return parse_visibility(visib_str)
+
+    def _parse_ceiling(self, clouds: List[Dict]) -> Optional[int]:
+        """Extract ceiling from clouds data"""
+        return parse_ceiling(clouds)
+
+    def _calculate_flight_category(self, visibility: Optional[float], ceiling: Optional[int]) -> str:
+        """Calculate flight category based on visibility and ceiling"""
+        return flight_category(visibility, ceiling)
+
+    def update_leds(self, weather_data: Dict):
+        """Update every region's LEDs from one set of weather data"""
+        with self.metrics.stage('led_push'):
+            for region in self.regions:
+                region.assign_stations(weather_data)
+                self.update_region(region, weather_data)
+        self.displayed = weather_data
+
+        first_paint = self.metrics.mark_first_paint('weather')
+        if first_paint is not None:
+            print(f"First weather on the LEDs {first_paint:.2f} s after start")
+
+    def update_region(self, region: Region, weather_data: Dict):
+        """Update one region's LEDs based on weather data"""
+        print(f"Updating LEDs for {region.name}...")
+
+        # Category code per LED, starting from all LEDs off
+        codes = [OFF_CODE] * region.led_count
+        effects = {}
+
+        updated_count = 0
+        for airport, led_index in region.airport_mapping.items():
+            # An alias shows the data of the station it names
+            data = weather_data.get(region.aliases.get(airport, airport))
+            if data is not None:
+                flight_category = data['flight_category']
+
+                try:
+                    codes[led_index] = CATEGORY_CODES.get(flight_category, UNKNOWN)
+                    updated_count += 1
+                    print(f"{airport} (LED {led_index}): {flight_category}")
+
+                    effect = self._effect_for(data)
+                    if effect:
+                        effects[led_index] = effect
+                except IndexError as e:
+                    print(f"Warning: Could not set LED {led_index} for {airport}: {e}")
+                    self.metrics.error('led')
+            else:
+                # No data available - set to dim color
+                try:
+                    codes[led_index] = UNKNOWN
+                    print(f"{airport} (LED {led_index}): NO DATA")
+                except IndexError as e:
+                    print(f"Warning: Could not set LED {led_index} for {airport}: {e}")
+                    self.metrics.error('led')
+
+        print(f"Updated {updated_count} LEDs with weather data")
+
+        # The whole frame as strip bytes, from the precomputed color tables
+        frame = region.pipeline.compose(codes)
+
+        if region.animator:
+            # The animation engine fades to the new frame and commits it
+            region.animator.set_frame(frame, codes, effects)
+            print(f"Animating {region.frame.changed(frame)} changes, {len(effects)} blinking stations")
+            return
+
+        # Write the frame in one go, or skip the refresh if nothing changed
+        changed = region.frame.commit(frame)
+        if changed:
+            print(f"{changed} pixels changed")
+        else:
+            print("No pixels changed - skipped LED refresh")
+
+    def _effect_for(self, data) -> Optional[str]:
+        """Blink effect for a station: thunderstorms flash, gusts pulse"""
+        wx_string = data.get('wx_string') or ''
+        if 'TS' in wx_string:
+            return STORM
+        if data.get('wind_gust'):
+            return GUST
+        return None
+
+    def print_status(self, weather_data: Dict, loop_count: int):
+        """Print current status"""
+        print(f"\n=== Weather Update #{loop_count} ===")
+        print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+        # Count categories
+        categories = {}
+        for data in weather_data.values():
+            cat = data['flight_category']
+            categories[cat] = categories.get(cat, 0) + 1
+
+        print(f"Flight Categories: {dict(categories)}")
+        print(f"Total airports: {len(weather_data)}")
+
+        for region in self.regions:
+            if region.animator:
+                stats = region.animator.stats()
+                print(f"Animation ({region.name}): {stats['fps']} fps, {stats['avg_render_ms']:.2f} ms/frame avg, "
+                      f"{stats['max_render_ms']:.2f} ms max, {stats['missed_frames']} missed frames")
+
+    def archive_weather(self, weather_data: Dict):
+        """Append this cycle's observations to the archive and compact it when due"""
+        if not self.archive:
+            return
+
+        try:
+            with self.metrics.stage('archive'):
+                inserted = self.archive.insert_cycle(weather_data)
+                print(f"Archived {inserted} new observations in {self.archive.last_insert_ms:.1f} ms")
+
+                pruned = self.archive.maybe_compact()
+                if pruned is not None:
+                    print(f"Archive compacted - pruned {pruned} old observations")
+        except sqlite3.Error as e:
+            print(f"Archive write failed: {e}")
+            self.metrics.error('archive')
+
+    def report_new_observations(self, scheduler: PollScheduler, weather_data: Dict):
+        """Print time-to-detect for observations that changed since the last cycle"""
+        for station, metar_type, latency in scheduler.observe(weather_data):
+            print(f"{station}: new {metar_type} detected {latency / 60:.1f} min after observation")
+
+        stats = scheduler.stats()
+        if stats['count']:
+            print(f"Time to detect: mean {stats['mean'] / 60:.1f} min, "
+                  f"max {stats['max'] / 60:.1f} min over {stats['count']} observations")
+
+    def _create_scheduler(self, update_interval_minutes, idle_interval_minutes,
+                          speci_interval_minutes, adaptive) -> PollScheduler:
+        """Build the poll scheduler and print the run configuration"""
+        dense = update_interval_minutes * 60
+        scheduler = PollScheduler(
+            dense_interval=dense,
+            idle_interval=idle_interval_minutes * 60 if adaptive else dense,
+            speci_interval=speci_interval_minutes * 60 if adaptive else dense
+        )
+
+        print("Starting NeoPixel Weather Map")
+        for region in self.regions:
+            if region.bbox is not None:
+                print(f"Region {region.name}: stations in {bbox_param(region.bbox)} on "
+                      f"{len(region.positions) + len(region.pinned)} of {region.led_count} LEDs")
+            else:
+                print(f"Region {region.name}: {len(region.airport_mapping)} airports on {region.led_count} LEDs")
+        print(f"Monitoring {len(self.stations())} airports" +
+              (f" and every station in {bbox_param(self.bbox())}" if self.bbox() else ""))
+        if adaptive:
+            print(f"Update interval: {update_interval_minutes} minutes around issuance, "
+                  f"{idle_interval_minutes} minutes otherwise")
+        else:
+            print(f"Update interval: {update_interval_minutes} minutes")
+
+        return scheduler
+
+    def run_continuous(self, update_interval_minutes=1, idle_interval_minutes=10,
+                       speci_interval_minutes=3, adaptive=True):
+        """
+        Run continuous weather monitoring loop
+
+        Args:
+            update_interval_minutes: Poll interval inside the issuance window
+                                     (~:45-:05), or always if not adaptive
+            idle_interval_minutes: Poll interval between issuance windows
+            speci_interval_minutes: Idle interval while SPECIs are arriving
+            adaptive: Back off between issuance windows
+        """
+        scheduler = self._create_scheduler(update_interval_minutes, idle_interval_minutes,
+                                           speci_interval_minutes, adaptive)
+
+        # Drop codes that can never answer before anything is requested
+        self.check_stations()
+
+        # Start the first fetch before the strips are opened, so driver
+        # imports, the state restore and the LED test all overlap with it
+        self.metrics.begin_cycle()
+        first_fetch = DaemonCall(self.get_weather_data, self.stations())
+
+        # Repaint the last-known-good state at once; run the LED test only
+        # when there is nothing to show yet, and only until the data is in
+        if not self.restore_state():
+            self.startup_sequence(until=first_fetch.done)
+
+        loop_count = 0
+
+        try:
+            while True:
+                loop_count += 1
+
+                if first_fetch is not None:
+                    weather_data = first_fetch.result()
+                    first_fetch = None
+                else:
+                    self.refresh_station_table()
+                    self.metrics.begin_cycle()
+
+                    # One fetch for the union of every region's airports
+                    airports = self.stations()
+
+                    # Fetch weather data
+                    weather_data = self.get_weather_data(airports)
+
+                if weather_data:
+                    # Update LEDs
+                    self.update_leds(weather_data)
+
+                    # Print status
+                    self.print_status(weather_data, loop_count)
+                    self.report_new_observations(scheduler, weather_data)
+                    self.archive_weather(weather_data)
+                    self.save_state(weather_data)
+                else:
+                    print("No weather data received - keeping previous state")
+                    self.metrics.error('no_data')
+
+                # Data age is reported for what the LEDs are showing
+                self.metrics.end_cycle(self.displayed)
+
+                # Sleep until the next deadline, counted from the last one
+                sleep_seconds = scheduler.advance()
+                print(f"\nSleeping for {sleep_seconds / 60:.1f} minutes...")
+                scheduler.wait()
+
+        except KeyboardInterrupt:
+            print("\nShutdown requested...")
+            self.shutdown()
+
+    def shutdown(self):
+        """Turn off all LEDs and close the archive"""
+        for region in self.regions:
+            region.frame.clear()  # Turn off all LEDs
+        if self.archive:
+            self.archive.close()
+        print("All LEDs turned off. Goodbye!")
+
+    async def _fetch_task(self, scheduler: PollScheduler, results: 'asyncio.Queue', deadline: float,
+                          first: Optional['asyncio.Future'] = None):
+        """
+        Fetch (and stream-parse) weather data on the poll schedule
+
+        Each fetch runs in a daemon thread and is abandoned once the deadline
+        passes, so a hung connection never blocks the event loop or exit. An
+        abandoned fetch is not restarted until its thread has finished.
+
+        Args:
+            first: First fetch, already started by the caller
+        """
+        pending = None
+
+        while True:
+            if first is None and pending is not None and not pending.done():
+                print("Previous fetch still running - skipping this cycle")
+            else:
+                if first is not None:
+                    pending, first = first, None
+                else:
+                    self.refresh_station_table()
+
+                    # One fetch for the union of every region's airports
+                    self.metrics.begin_cycle()
+                    pending = DaemonCall(self.get_weather_data, self.stations()).future()
+                try:
+                    weather_data = await asyncio.wait_for(asyncio.shield(pending), deadline)
+                except asyncio.TimeoutError:
+                    print(f"Fetch exceeded the {deadline:.0f} s deadline - keeping previous state")
+                    self.metrics.error('deadline')
+                    weather_data = {}
+
+                if weather_data:
+                    # Only the newest result matters; drop one the display has not taken yet
+                    if results.full():
+                        results.get_nowait()
+                    results.put_nowait(weather_data)
+                else:
+                    print("No weather data received - keeping previous state")
+                    self.metrics.error('no_data')
+                    self.metrics.end_cycle(self.displayed)
+
+            # Sleep until the next deadline, counted from the last one
+            sleep_seconds = scheduler.advance()
+            print(f"\nNext fetch in {sleep_seconds / 60:.1f} minutes...")
+            await asyncio.sleep(sleep_seconds)
+
+    async def _display_task(self, scheduler: PollScheduler, results: 'asyncio.Queue',
+                            self_test: Optional['asyncio.Future'] = None,
+                            data_ready: Optional[threading.Event] = None):
+        """
+        Push each new result to the LEDs, status output and archive
+
+        Args:
+            self_test: Running LED test, stopped by setting data_ready when
+                       the first result arrives
+            data_ready: Event the LED test waits on
+        """
+        loop_count = 0
+        while True:
+            weather_data = await results.get()
+            loop_count += 1
+
+            if self_test is not None:
+                data_ready.set()
+                await self_test
+                self_test = None
+
+            self.update_leds(weather_data)
+            self.print_status(weather_data, loop_count)
+            self.report_new_observations(scheduler, weather_data)
+            self.archive_weather(weather_data)
+            self.save_state(weather_data)
+            self.metrics.end_cycle(self.displayed)
+
+    async def run_async(self, update_interval_minutes=1, idle_interval_minutes=10,
+                        speci_interval_minutes=3, adaptive=True, fetch_deadline_seconds=30):
+        """
+        Run continuous weather monitoring on an asyncio event loop
+
+        Fetching and LED output are separate tasks, so a slow or hung network
+        call never stalls the strip or shutdown. SIGINT / SIGTERM stop the map
+        immediately, even mid-fetch.
+
+        Args:
+            update_interval_minutes: Poll interval inside the issuance window
+                                     (~:45-:05), or always if not adaptive
+            idle_interval_minutes: Poll interval between issuance windows
+            speci_interval_minutes: Idle interval while SPECIs are arriving
+            adaptive: Back off between issuance windows
+            fetch_deadline_seconds: Give up on a fetch after this long
+        """
+        scheduler = self._create_scheduler(update_interval_minutes, idle_interval_minutes,
+                                           speci_interval_minutes, adaptive)
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform - KeyboardInterrupt still applies
+
+        # Drop codes that can never answer before anything is requested
+        self.check_stations()
+
+        # Start the first fetch before the strips are opened, so driver
+        # imports, the state restore and the LED test all overlap with it
+        self.metrics.begin_cycle()
+        first_fetch = DaemonCall(self.get_weather_data, self.stations()).future()
+
+        # Repaint the last-known-good state at once; otherwise run the LED
+        # test until the first result arrives (it sleeps between colors, so
+        # keep it off the loop)
+        data_ready = threading.Event()
+        self_test = None
+        if not self.restore_state():
+            self_test = asyncio.ensure_future(asyncio.to_thread(self.startup_sequence, data_ready))
+
+        if self.animate:
+            for region in self.regions:
+                region.animator = Animator(region.frame, region.pipeline, fps=self.fps, cpu_budget=self.cpu_budget)
+
+        results = asyncio.Queue(maxsize=1)
+        tasks = [asyncio.create_task(self._fetch_task(scheduler, results, fetch_deadline_seconds, first_fetch)),
+                 asyncio.create_task(self._display_task(scheduler, results, self_test, data_ready))]
+        tasks += [asyncio.create_task(region.animator.run()) for region in self.regions if region.animator]
+        stopper = asyncio.create_task(stop.wait())
+
+        try:
+            # Returns on a stop signal, or if a task fails
+            done, _ = await asyncio.wait(tasks + [stopper], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stopper and task.exception():
+                    print(f"Unexpected error: {task.exception()}")
+        finally:
+            print("\nShutdown requested...")
+            data_ready.set()  # End an LED test still running
+            for task in tasks + [stopper]:
+                task.cancel()
+            await asyncio.gather(*tasks, stopper, return_exceptions=True)
+            if self_test is not None:
+                await asyncio.gather(self_test, return_exceptions=True)
+            self.shutdown()
+
+
+def main(default_regions: Optional[List[str]] = None, description: str = 'Aviation Weather Map'):
+    """
+    Main function
+
+    Args:
+        default_regions: Region profiles used when --region is not given
+        description: Program description for --help
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--region', action='append', dest='regions',
+                        help='Region profile (path or name in regions/); repeat for several maps')
+    parser.add_argument('--led-count', type=int, default=None,
+                        help="Number of LEDs (overrides each region profile)")
+    parser.add_argument('--update-interval', type=int, default=1,
+                        help='Update interval in minutes around METAR issuance (~:45-:05)')
+    parser.add_argument('--idle-interval', type=int, default=10,
+                        help='Update interval in minutes between issuance windows')
+    parser.add_argument('--speci-interval', type=int, default=3,
+                        help='Idle update interval in minutes while SPECIs are being issued')
+    parser.add_argument('--fixed-interval', action='store_true',
+                        help='Poll every --update-interval minutes regardless of issuance times')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run fetching and LED output as separate asyncio tasks')
+    parser.add_argument('--fetch-deadline', type=float, default=30,
+                        help='Seconds before an --async fetch is abandoned')
+    parser.add_argument('--animate', action='store_true',
+                        help='Cross-fade category changes and blink gusts/thunderstorms (implies --async)')
+    parser.add_argument('--fps', type=int, default=30,
+                        help='Animation frame rate')
+    parser.add_argument('--cpu-budget', type=float, default=0.2,
+                        help='Fraction of one CPU core animation may use before the frame rate is lowered')
+    parser.add_argument('--backend', choices=BACKENDS, default='neopixel',
+                        help='Pixel backend: real strip, in-memory simulation, or terminal display')
+    parser.add_argument('--bulk', nargs='?', const=BULK_CSV_URL, default=None, metavar='SOURCE',
+                        help='Read the all-stations METAR dataset (URL or local .csv/.xml[.gz] file) '
+                             'instead of querying by airport ID')
+    parser.add_argument('--raw-feed', action='store_true',
+                        help='Request the plain-text METAR feed and decode it locally instead of JSON')
+    parser.add_argument('--archive', nargs='?', const=DEFAULT_ARCHIVE_PATH, default=None, metavar='PATH',
+                        help='Append every observation to a local SQLite archive '
+                             '(query it with metar_archive.py)')
+    parser.add_argument('--retention-days', type=float, default=30,
+                        help='Days of history kept in the archive')
+    parser.add_argument('--remote', default=None, metavar='URL',
+                        help='Read weather data from a metar_server.py instance '
+                             '(e.g. http://192.168.1.10:8088/metar.json) instead of aviationweather.gov')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='Directory for the API response cache')
+    parser.add_argument('--cache-ttl', type=int, default=180,
+                        help='Minutes a cached response may be revalidated before it is discarded')
+    parser.add_argument('--state-file', default=None, metavar='PATH',
+                        help='Last-known-good state file (default: last_known_good.bin in the cache directory)')
+    parser.add_argument('--no-state', action='store_true',
+                        help="Don't save or restore the last-known-good state")
+    parser.add_argument('--state-max-age', type=float, default=DEFAULT_MAX_AGE_SECONDS / 3600,
+                        help='Hours after which a saved observation is no longer repainted at startup')
+    parser.add_argument('--stations-file', default=None, metavar='PATH',
+                        help=f'Station table file (default: CACHE_DIR/{STATIONS_FILE_NAME})')
+    parser.add_argument('--stations-refresh-days', type=float, default=DEFAULT_REFRESH_DAYS,
+                        help='Download a new station table once the local one is this many days old')
+    parser.add_argument('--no-station-check', action='store_true',
+                        help="Don't check airport codes against the station table")
+    parser.add_argument('--metrics-dir', default=None, metavar='DIR',
+                        help='Write per-cycle metrics to DIR/metar_map.prom (Prometheus textfile) '
+                             'and DIR/metar_map.json')
+
+    args = parser.parse_args()
+
+    try:
+        regions = [Region.from_file(path, backend=args.backend, led_count=args.led_count)
+                   for path in (args.regions or default_regions or ['ne'])]
+
+        # Create weather map instance
+        weather_map = WeatherMap(regions, cache_dir=args.cache_dir, cache_ttl_minutes=args.cache_ttl,
+                                 bulk_source=args.bulk, raw_feed=args.raw_feed,
+                                 archive_path=args.archive, archive_retention_days=args.retention_days,
+                                 remote_source=args.remote, animate=args.animate,
+                                 fps=args.fps, cpu_budget=args.cpu_budget,
+                                 metrics=CycleMetrics('metar_map', args.metrics_dir),
+                                 state_path=None if args.no_state else
+                                 args.state_file or os.path.join(args.cache_dir, STATE_FILE_NAME),
+                                 state_max_age_hours=args.state_max_age,
+                                 station_table=None if args.no_station_check else
+                                 StationTable(args.stations_file or os.path.join(args.cache_dir, STATIONS_FILE_NAME),
+                                              refresh_days=args.stations_refresh_days))
+
+        # Run continuous monitoring
+        intervals = dict(update_interval_minutes=args.update_interval,
+                         idle_interval_minutes=args.idle_interval,
+                         speci_interval_minutes=args.speci_interval,
+                         adaptive=not args.fixed_interval)
+        if args.use_async or args.animate:
+            asyncio.run(weather_map.run_async(fetch_deadline_seconds=args.fetch_deadline, **intervals))
+        else:
+            weather_map.run_continuous(**intervals)
+
+    except KeyboardInterrupt:
+        print("\nProgram interrupted by user")
+    except Exception as e:
+        print(f"Error: {e}")
+        print("Make sure to run with: sudo /path/to/venv/bin/python metar_map.py")
+
+
+if __name__ == "__main__":
+    main()
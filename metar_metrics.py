@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Per-cycle performance metrics
+Records how long each stage of an update cycle takes (request, download,
+parse, classify, LED push, archive), bytes received, error counts and the
+age of each station's data. After every cycle they are exported as a
+Prometheus textfile (for node_exporter's textfile collector) and as a JSON
+stats file.
+
+Stage times are exclusive: time spent in a nested stage (e.g. download
+inside a fetch) is not counted again in the enclosing one, so the stages of
+a cycle add up to at most its duration. Stages run by concurrent workers
+(e.g. chunked fetches) are summed across the workers.
+
+Time to first paint is measured from process start (interpreter startup and
+imports included) to the first frame the strips show from the saved state
+and from fetched weather.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+STAGES = ('request', 'download', 'parse', 'classify', 'led_push', 'archive')
+
+STAGE_HELP = {
+    'request': 'connecting, waiting for response headers and cache I/O',
+    'download': 'waiting for response body chunks',
+    'parse': 'parsing and decoding reports',
+    'classify': 'computing flight categories',
+    'led_push': 'composing frames and writing them to the strips',
+    'archive': 'writing observations to the archive',
+}
+
+
+# Fallback process start for systems without /proc
+_IMPORTED = time.monotonic()
+
+
+def process_uptime() -> float:
+    """Seconds since this process started (since this module was imported if /proc is unavailable)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesized command name; starttime is the 20th
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return round(max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK')), 3)
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _IMPORTED
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, data: str):
+    """Replace a file in one step so scrapers never read a partial export"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class CycleMetrics:
+    def __init__(self, daemon: str = 'metar_map', metrics_dir: Optional[str] = None):
+        """
+        Initialize the metrics recorder
+
+        Args:
+            daemon: Name used as the `daemon` label and for the export files
+            metrics_dir: Directory for <daemon>.prom and <daemon>.json
+                         (None to record without exporting)
+        """
+        self.daemon = daemon
+        self.textfile_path = os.path.join(metrics_dir, f"{daemon}.prom") if metrics_dir else None
+        self.json_path = os.path.join(metrics_dir, f"{daemon}.json") if metrics_dir else None
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+
+        # Cumulative counters
+        self.cycles = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.bytes_total = 0
+
+        # Seconds from process start to the first paint, by source
+        self.first_paint: Dict[str, float] = {}
+
+        # Figures of the last completed cycle
+        self.last: Dict = {}
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        """Start collecting a new cycle"""
+        self.cycle_started = time.time()
+        self._cycle_start = time.perf_counter()
+        self.stages: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.fetch_seconds = 0.0
+        self.bytes_received = 0
+
+    def begin_cycle(self):
+        """Mark the start of an update cycle"""
+        with self._lock:
+            self._reset()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as one stage of the current cycle"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        start = time.perf_counter()
+        stack.append(0.0)  # Time spent in nested stages
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+            if stack:
+                stack[-1] += elapsed
+
+    @contextmanager
+    def offloaded(self):
+        """Leave a block out of the enclosing stage, e.g. waiting on workers that time their own stages"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if stack:
+                stack[-1] += time.perf_counter() - start
+
+    @contextmanager
+    def fetch(self):
+        """Time a whole fetch; its remainder outside nested stages counts as 'request'"""
+        start = time.perf_counter()
+        try:
+            with self.stage('request'):
+                yield
+        finally:
+            self.fetch_seconds += time.perf_counter() - start
+
+    def metered(self, chunks: Iterable[bytes], count_bytes: bool = True) -> Iterator[bytes]:
+        """
+        Pass response body chunks through, timing the wait for each as download
+
+        Args:
+            chunks: Body chunks, as consumed by a streaming parser
+            count_bytes: Add the chunk sizes to bytes received
+        """
+        iterator = iter(chunks)
+        while True:
+            with self.stage('download'):
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            if count_bytes:
+                self.add_bytes(len(chunk))
+            yield chunk
+
+    def add_bytes(self, count: int):
+        """Count bytes received from the network"""
+        with self._lock:
+            self.bytes_received += count
+            self.bytes_total += count
+
+    def error(self, kind: str):
+        """Count an error, e.g. 'fetch', 'deadline', 'no_data', 'led'"""
+        with self._lock:
+            self.errors[kind] += 1
+
+    def mark_first_paint(self, source: str) -> Optional[float]:
+        """
+        Record the time to the first frame painted from a source
+
+        Args:
+            source: 'restored' for the saved state, 'weather' for fetched data
+
+        Returns:
+            Seconds since process start, or None if this source was already painted
+        """
+        with self._lock:
+            if source in self.first_paint:
+                return None
+            seconds = self.first_paint[source] = process_uptime()
+        self.export()
+        return seconds
+
+    def end_cycle(self, weather_data: Optional[Dict] = None, now: Optional[float] = None):
+        """
+        Finish the current cycle and export it
+
+        Args:
+            weather_data: Station to record for this cycle, used for data age
+            now: Current Unix time (defaults to time.time())
+        """
+        now = now if now is not None else time.time()
+
+        ages = {}
+        for station, record in (weather_data or {}).items():
+            obs_time = record.get('obs_time') if isinstance(record, dict) else getattr(record, 'obs_time', None)
+            if obs_time:
+                ages[station] = max(0.0, now - obs_time)
+
+        with self._lock:
+            self.cycles += 1
+            self.last = {
+                'started': self.cycle_started,
+                'duration_seconds': time.perf_counter() - self._cycle_start,
+                'fetch_seconds': self.fetch_seconds,
+                'stage_seconds': dict(self.stages),
+                'bytes_received': self.bytes_received,
+                'stations': len(weather_data or {}),
+                'data_age_seconds': ages,
+            }
+            self._reset()
+
+        self.export(now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        """Return every metric as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'daemon': self.daemon,
+                'updated': now if now is not None else time.time(),
+                'cycles': self.cycles,
+                'bytes_total': self.bytes_total,
+                'errors': dict(self.errors),
+                'first_paint_seconds': dict(self.first_paint),
+                'last_cycle': dict(self.last),
+            }
+
+    def prometheus(self, now: Optional[float] = None) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        snapshot = self.snapshot(now)
+        last = snapshot['last_cycle']
+        daemon = f'daemon="{_escape(self.daemon)}"'
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join([daemon] + [f'{k}="{_escape(str(v))}"' for k, v in labels.items()])
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        metric('metar_cycles_total', 'counter', 'Update cycles completed', [({}, snapshot['cycles'])])
+        metric('metar_received_bytes_total', 'counter', 'Bytes received from upstream',
+               [({}, snapshot['bytes_total'])])
+        metric('metar_errors_total', 'counter', 'Errors by kind',
+               [({'kind': kind}, count) for kind, count in sorted(snapshot['errors'].items())])
+        metric('metar_last_cycle_timestamp_seconds', 'gauge', 'Unix time the last cycle finished',
+               [({}, snapshot['updated'])])
+        if snapshot['first_paint_seconds']:
+            metric('metar_first_paint_seconds', 'gauge',
+                   'Seconds from process start to the first frame painted from each source',
+                   [({'source': source}, seconds)
+                    for source, seconds in sorted(snapshot['first_paint_seconds'].items())])
+
+        if last:
+            metric('metar_cycle_duration_seconds', 'gauge', 'Duration of the last update cycle',
+                   [({}, last['duration_seconds'])])
+            metric('metar_fetch_seconds', 'gauge', 'Wall time of the last fetch, all of its stages included',
+                   [({}, last['fetch_seconds'])])
+            metric('metar_stage_seconds', 'gauge',
+                   'Time of each stage in the last cycle (' +
+                   '; '.join(f"{stage}: {text}" for stage, text in STAGE_HELP.items()) + ')',
+                   [({'stage': stage}, seconds) for stage, seconds in last['stage_seconds'].items()])
+            metric('metar_cycle_received_bytes', 'gauge', 'Bytes received in the last cycle',
+                   [({}, last['bytes_received'])])
+            metric('metar_stations_reporting', 'gauge', 'Stations with data in the last cycle',
+                   [({}, last['stations'])])
+            metric('metar_data_age_seconds', 'gauge', 'Age of each station\'s latest observation',
+                   [({'station': station}, age) for station, age in sorted(last['data_age_seconds'].items())])
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, now: Optional[float] = None):
+        """Write the textfile and JSON stats file, if a metrics directory is set"""
+        if not self.textfile_path:
+            return
+        try:
+            _write_atomic(self.textfile_path, self.prometheus(now))
+            _write_atomic(self.json_path, json.dumps(self.snapshot(now), indent=2, sort_keys=True))
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Pixel backends for the LED map
+The real NeoPixel strip, an in-memory simulated strip that records frames
+and models WS2812 transfer time, and a terminal renderer for running a map
+without hardware
+
+Backends take whole frames through write(): a bytes-like object holding 3
+bytes per LED in the strip's wire order (see metar_color.py), copied in one
+go and then shown.
+"""
+
+import sys
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+Color = Tuple[int, int, int]
+
+BACKENDS = ('neopixel', 'sim', 'terminal')
+
+# WS2812 timing: 24 bits per LED at 800 kHz, then a latch/reset gap
+WS2812_LED_US = 30.0
+WS2812_RESET_US = 280.0
+
+
+class PixelBackend:
+    """
+    Interface every pixel driver provides
+
+    Supports write(frame), pixels[i] = color, pixels[i], len(pixels), fill()
+    and show(). Colors and frame bytes are in the strip's channel order.
+    """
+
+    def __init__(self, led_count: int, brightness: float = 1.0):
+        self.led_count = led_count
+        self.brightness = brightness
+
+    def __len__(self) -> int:
+        return self.led_count
+
+    def __setitem__(self, index: int, color: Color):
+        raise NotImplementedError
+
+    def __getitem__(self, index: int) -> Color:
+        raise NotImplementedError
+
+    def fill(self, color: Color):
+        raise NotImplementedError
+
+    def show(self):
+        raise NotImplementedError
+
+    def write(self, frame: bytes):
+        """Set every pixel from a frame of strip bytes and show it"""
+        for i in range(min(self.led_count, len(frame) // 3)):
+            self[i] = tuple(frame[i * 3:i * 3 + 3])
+        self.show()
+
+
+class NeoPixelBackend(PixelBackend):
+    """
+    Adafruit NeoPixel strip on a Raspberry Pi GPIO pin
+
+    The driver is set to pass colors through in the order given (frames are
+    already in wire order), and write() copies a frame straight into the
+    driver's transmit buffer when it exposes one.
+    """
+
+    def __init__(self, led_count: int, brightness: float = 1.0, pin: str = 'D18'):
+        super().__init__(led_count, brightness)
+
+        # Hardware libraries only exist on the Pi
+        import board
+        import neopixel
+
+        self.strip = neopixel.NeoPixel(getattr(board, pin), led_count, brightness=brightness,
+                                       auto_write=False, pixel_order=neopixel.RGB)
+
+        # Transmit buffer: `buf` on older drivers, the post-brightness buffer
+        # on PixelBuf-based ones. Only safe to write when the driver does not
+        # scale it (brightness is applied by the color pipeline instead).
+        self._raw, self._offset = None, 0
+        if brightness == 1.0:
+            raw = getattr(self.strip, 'buf', None)
+            if raw is None:
+                raw = getattr(self.strip, '_post_brightness_buffer', None)
+                self._offset = getattr(self.strip, '_offset', 0)
+            if isinstance(raw, bytearray) and len(raw) >= self._offset + led_count * 3:
+                self._raw = raw
+
+    def __setitem__(self, index: int, color: Color):
+        self.strip[index] = color
+
+    def __getitem__(self, index: int) -> Color:
+        return tuple(self.strip[index])
+
+    def fill(self, color: Color):
+        self.strip.fill(color)
+
+    def show(self):
+        self.strip.show()
+
+    def write(self, frame: bytes):
+        if self._raw is None:
+            super().write(frame)
+            return
+        self._raw[self._offset:self._offset + len(frame)] = frame
+        self.strip.show()
+
+
+class SimulatedPixels(PixelBackend):
+    """
+    In-memory strip that records every shown frame
+
+    Each show() adds the time a real WS2812 strip of this length would
+    spend on the wire to `modeled_seconds`; with realtime=True it also
+    sleeps for that long.
+    """
+
+    def __init__(self, led_count: int, brightness: float = 1.0, realtime: bool = False,
+                 max_frames: Optional[int] = 100, led_us: float = WS2812_LED_US,
+                 reset_us: float = WS2812_RESET_US):
+        super().__init__(led_count, brightness)
+        self.realtime = realtime
+        self.led_us = led_us
+        self.reset_us = reset_us
+
+        # Strip bytes, 3 per LED
+        self.raw = bytearray(led_count * 3)
+        self.frames: Deque[bytes] = deque(maxlen=max_frames)
+        self.shows = 0
+        self.modeled_seconds = 0.0
+
+    def __setitem__(self, index: int, color: Color):
+        if not -self.led_count <= index < self.led_count:
+            raise IndexError(f"LED index {index} out of range for {self.led_count} LEDs")
+        index %= self.led_count
+        self.raw[index * 3:index * 3 + 3] = bytes(color)
+
+    def __getitem__(self, index: int) -> Color:
+        index %= self.led_count
+        return tuple(self.raw[index * 3:index * 3 + 3])
+
+    @property
+    def buffer(self) -> List[Color]:
+        """Current pixel colors, as tuples"""
+        raw = self.raw
+        return [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+
+    def fill(self, color: Color):
+        self.raw = bytearray(bytes(color) * self.led_count)
+
+    def write(self, frame: bytes):
+        if len(frame) != len(self.raw):
+            raise ValueError(f"Frame is {len(frame)} bytes, expected {len(self.raw)}")
+        self.raw[:] = frame
+        self.show()
+
+    def transfer_seconds(self) -> float:
+        """Time a real strip of this length spends receiving one frame"""
+        return (self.led_count * self.led_us + self.reset_us) / 1e6
+
+    def show(self):
+        self.frames.append(bytes(self.raw))
+        self.shows += 1
+
+        transfer = self.transfer_seconds()
+        self.modeled_seconds += transfer
+        if self.realtime:
+            time.sleep(transfer)
+
+
+class TerminalPixels(SimulatedPixels):
+    """Simulated strip that draws each shown frame as a row of colored blocks"""
+
+    def __init__(self, led_count: int, brightness: float = 1.0, channel_order: str = 'RGB',
+                 stream=None, **kwargs):
+        super().__init__(led_count, brightness, **kwargs)
+        self.channel_order = channel_order
+        self.stream = stream or sys.stdout
+
+    def _to_rgb(self, color: Color) -> Color:
+        """Reorder a strip-order color into (R, G, B) scaled by brightness"""
+        channels = dict(zip(self.channel_order, color))
+        return tuple(int(channels[c] * self.brightness) for c in 'RGB')
+
+    def show(self):
+        super().show()
+        cells = []
+        for color in self.buffer:
+            r, g, b = self._to_rgb(color)
+            cells.append(f"\x1b[48;2;{r};{g};{b}m \x1b[0m")
+        self.stream.write(''.join(cells) + '\n')
+        self.stream.flush()
+
+
+def create_backend(name: str, led_count: int, brightness: float = 1.0,
+                   pin: str = 'D18', channel_order: str = 'RGB') -> PixelBackend:
+    """
+    Build a pixel backend by name
+
+    Args:
+        name: One of BACKENDS
+        led_count: Number of LEDs on the strip
+        brightness: Strip brightness 0.0-1.0
+        pin: Board pin name for the real strip
+        channel_order: Wire order of frame bytes, for the terminal display
+
+    Returns:
+        The pixel backend
+    """
+    if name == 'neopixel':
+        return NeoPixelBackend(led_count, brightness=brightness, pin=pin)
+    if name == 'sim':
+        return SimulatedPixels(led_count, brightness=brightness)
+    if name == 'terminal':
+        return TerminalPixels(led_count, brightness=brightness, channel_order=channel_order)
+    raise ValueError(f"Unknown pixel backend '{name}' (choose from {', '.join(BACKENDS)})")
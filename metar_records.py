@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compact per-station METAR records
+Slotted classes replace the per-station dicts built every cycle: no
+per-instance __dict__, station IDs and other repeating strings are
+interned, the flight category is a 1-byte code, and raw METAR text is
+bounded. Callers keep the dict-style read API (record['flight_category'],
+record.get('temp'), record.items(), ...).
+"""
+
+import sys
+from typing import Any, Iterator, Optional, Tuple
+
+from metar_category import CATEGORIES, CATEGORY_CODES, UNKNOWN
+
+# Longest raw METAR text kept per station
+MAX_RAW_TEXT = 256
+# Longest station name kept per station
+MAX_STATION_NAME = 64
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a repeating string so every cycle shares one copy"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class WeatherRecord:
+    """Weather for one station as used by the LED map"""
+
+    __slots__ = ('station_id', 'category_code', 'visibility_mi', 'ceiling_ft', 'temp',
+                 'wind_speed', 'wind_gust', 'wx_string', 'report_time', 'obs_time', 'metar_type',
+                 'lat', 'lon')
+
+    # Keys exposed through the dict-style API, in display order
+    KEYS: Tuple[str, ...] = ('flight_category', 'visibility_mi', 'ceiling_ft', 'temp',
+                             'wind_speed', 'wind_gust', 'wx_string', 'report_time', 'obs_time',
+                             'metar_type', 'lat', 'lon')
+
+    def __init__(self, station_id: str, visibility_mi: Optional[float] = None,
+                 ceiling_ft: Optional[int] = None, temp=None, wind_speed=None, wind_gust=None,
+                 wx_string: Optional[str] = None, report_time: Optional[str] = None, obs_time: Optional[int] = None,
+                 metar_type: Optional[str] = None, category_code: int = UNKNOWN,
+                 lat: Optional[float] = None, lon: Optional[float] = None):
+        self.station_id = sys.intern(station_id)
+        self.category_code = category_code
+        self.visibility_mi = visibility_mi
+        self.ceiling_ft = ceiling_ft
+        self.temp = temp
+        self.wind_speed = wind_speed
+        self.wind_gust = wind_gust
+        self.wx_string = _intern(wx_string)
+        self.report_time = report_time
+        self.obs_time = obs_time
+        self.metar_type = _intern(metar_type)
+        # Station position, for bounding-box regions
+        self.lat = lat
+        self.lon = lon
+
+    @property
+    def flight_category(self) -> str:
+        return CATEGORIES[self.category_code]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.KEYS else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def keys(self):
+        return self.KEYS
+
+    def values(self):
+        return [getattr(self, key) for key in self.KEYS]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.KEYS]
+
+    def to_dict(self) -> dict:
+        """Return a plain dict copy"""
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, station_id: str, data: dict) -> 'WeatherRecord':
+        """Rebuild a record from a to_dict() copy (e.g. one received as JSON)"""
+        fields = {key: data.get(key) for key in cls.KEYS if key != 'flight_category' and key in data}
+        return cls(station_id, category_code=CATEGORY_CODES.get(data.get('flight_category'), UNKNOWN),
+                   **fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.station_id!r}, {self.to_dict()!r})"
+
+
+class METARRecord(WeatherRecord):
+    """Full METAR detail for one station as used by the scraper"""
+
+    __slots__ = ('raw_text', 'dewp', 'wind_dir', 'altimeter', 'station_name')
+
+    KEYS = ('raw_text', 'flight_category', 'visibility_mi', 'ceiling_ft', 'temp', 'dewp',
+            'wind_dir', 'wind_speed', 'altimeter', 'report_time', 'station_name')
+
+    def __init__(self, station_id: str, raw_text: str = 'N/A', dewp=None, wind_dir=None,
+                 altimeter=None, station_name: str = 'Unknown', **fields):
+        super().__init__(station_id, **fields)
+        self.raw_text = raw_text[:MAX_RAW_TEXT] if isinstance(raw_text, str) else raw_text
+        self.dewp = dewp
+        self.wind_dir = _intern(wind_dir)
+        self.altimeter = altimeter
+        self.station_name = _intern(station_name[:MAX_STATION_NAME]
+                                    if isinstance(station_name, str) else station_name)
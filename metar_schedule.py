@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Issuance-aware polling scheduler
+Routine METARs are issued shortly before the top of each hour, so the map
+polls densely around that window and backs off between windows. Recent
+SPECI reports (changing weather) shorten the idle interval.
+
+Deadlines run on the monotonic clock, so time spent fetching and drawing
+does not push the schedule later.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class PollScheduler:
+    def __init__(self, dense_interval: float = 60, idle_interval: float = 600,
+                 speci_interval: float = 180, window_start_minute: int = 45,
+                 window_end_minute: int = 5, speci_hold_seconds: float = 3600):
+        """
+        Initialize the scheduler
+
+        Args:
+            dense_interval: Seconds between polls inside the issuance window
+            idle_interval: Seconds between polls outside the window
+            speci_interval: Idle interval while recent SPECIs are being seen
+            window_start_minute: Minute past the hour the dense window opens
+            window_end_minute: Minute past the hour the dense window closes
+                               (may wrap past the top of the hour)
+            speci_hold_seconds: How long after a SPECI the shorter interval applies
+        """
+        self.dense_interval = dense_interval
+        self.idle_interval = idle_interval
+        self.speci_interval = speci_interval
+        self.window_start = window_start_minute * 60
+        self.window_end = window_end_minute * 60
+        self.speci_hold_seconds = speci_hold_seconds
+
+        self.deadline = time.monotonic()
+        self.last_speci = None  # monotonic time of the last new SPECI
+
+        # Last observation time seen per station, for time-to-detect
+        self.last_obs: Dict[str, float] = {}
+        # Running time-to-detect totals; a list of every latency would grow
+        # for as long as the daemon runs
+        self.detect_count = 0
+        self.detect_total = 0.0
+        self.detect_max = 0.0
+
+    def in_window(self, wall_time: Optional[float] = None) -> bool:
+        """Return True if wall_time falls inside the issuance window"""
+        second_of_hour = (wall_time if wall_time is not None else time.time()) % 3600
+        if self.window_start <= self.window_end:
+            return self.window_start <= second_of_hour < self.window_end
+        return second_of_hour >= self.window_start or second_of_hour < self.window_end
+
+    def next_interval(self, wall_time: Optional[float] = None) -> float:
+        """Return the seconds until the next poll given the current wall time"""
+        wall_time = wall_time if wall_time is not None else time.time()
+
+        if self.in_window(wall_time):
+            return self.dense_interval
+
+        interval = self.idle_interval
+        if self.last_speci is not None and time.monotonic() - self.last_speci < self.speci_hold_seconds:
+            interval = min(interval, self.speci_interval)
+
+        # Never sleep past the opening of the next window
+        until_window = (self.window_start - wall_time % 3600) % 3600
+        return max(min(interval, until_window), self.dense_interval)
+
+    def advance(self) -> float:
+        """
+        Move the deadline forward by one interval
+
+        The next deadline is counted from the previous deadline, not from
+        when the cycle's work finished. If the process fell behind by more
+        than an interval, it restarts from now instead of bursting.
+
+        Returns:
+            Seconds from now until the new deadline
+        """
+        now = time.monotonic()
+        interval = self.next_interval()
+        self.deadline += interval
+        if self.deadline < now:
+            self.deadline = now + interval
+        return self.deadline - now
+
+    def wait(self):
+        """Sleep until the current deadline"""
+        remaining = self.deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def observe(self, weather_data: Dict) -> List[Tuple[str, str, float]]:
+        """
+        Record a cycle's observations
+
+        Args:
+            weather_data: Weather data with 'obs_time' (epoch seconds) and
+                          'metar_type' per station
+
+        Returns:
+            (station, metar_type, seconds from observation to detection) for
+            each station whose observation changed since the last cycle
+        """
+        now = time.time()
+        new_observations = []
+
+        for station, data in weather_data.items():
+            obs_time = data.get('obs_time')
+            if obs_time is None:
+                continue
+
+            previous = self.last_obs.get(station)
+            self.last_obs[station] = obs_time
+
+            # The first sighting has no baseline to measure detection against
+            if previous is None or obs_time <= previous:
+                continue
+
+            latency = now - obs_time
+            metar_type = data.get('metar_type') or 'METAR'
+            new_observations.append((station, metar_type, latency))
+            self.detect_count += 1
+            self.detect_total += latency
+            self.detect_max = max(self.detect_max, latency)
+
+            if metar_type == 'SPECI':
+                self.last_speci = time.monotonic()
+
+        return new_observations
+
+    def stats(self) -> Dict[str, float]:
+        """Return time-to-detect statistics in seconds"""
+        if not self.detect_count:
+            return {'count': 0}
+        return {
+            'count': self.detect_count,
+            'mean': self.detect_total / self.detect_count,
+            'max': self.detect_max
+        }
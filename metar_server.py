@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Local METAR fan-out server
+Fetches the stations of every configured region once per cycle (with the
+same WeatherMap.get_weather_data logic the maps use) and serves the latest
+result to any number of boards on the LAN, so upstream load stays at one
+fetcher no matter how many maps are running
+
+Endpoints:
+    GET /metar.json[?ids=KBOS,KORH][&wait=SECONDS]
+        {"generated": <unix time>, "version": <n>, "stations": {"KBOS": {...}}}
+        Sends an ETag; a matching If-None-Match gets a 304. With wait=, a
+        client whose ETag is current is held until new data arrives (long
+        poll, up to MAX_WAIT seconds) before the 304 is sent. An ids=
+        response's ETag covers the whole published data plus the filter,
+        so it changes when any station does, not only the listed ones.
+    GET /health
+        Fetcher status
+
+Usage:
+    python3 metar_server.py --region ne --region se [--port 8088]
+    python3 metar_map.py --region ne --remote http://<server>:8088/metar.json
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from metar_bulk import BULK_CSV_URL
+from metar_cache import DEFAULT_CACHE_DIR
+from metar_map import WeatherMap, load_profile
+from metar_metrics import CycleMetrics
+from metar_schedule import PollScheduler
+
+DEFAULT_PORT = 8088
+
+# Longest long-poll hold, in seconds
+MAX_WAIT = 300
+# Seconds a client has to send its request headers
+REQUEST_TIMEOUT = 10
+MAX_HEADER_BYTES = 16384
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed'}
+
+
+class FanoutServer:
+    def __init__(self, stations: List[str], weather_map: WeatherMap,
+                 scheduler: Optional[PollScheduler] = None):
+        """
+        Initialize the server
+
+        Args:
+            stations: Airport codes fetched upstream every cycle
+            weather_map: Map whose fetch logic (cache, bulk or raw feed) is used
+            scheduler: Poll schedule for upstream fetches (issuance-aware default)
+        """
+        self.stations = stations
+        self.weather_map = weather_map
+        self.scheduler = scheduler or PollScheduler()
+
+        self.records: Dict[str, Dict] = {}
+        self.version = 0
+        self.etag = '"0"'
+        self.generated = 0.0
+        self.last_fetch_ok = False
+        self.upstream_fetches = 0
+        self.requests_served = 0
+        self.not_modified = 0
+
+        # Notified whenever new data is published, for long-poll clients
+        self.changed = asyncio.Condition()
+        self.waiting = 0
+
+    async def publish(self, weather_data: Dict) -> bool:
+        """
+        Make a new fetch result visible to clients, if it differs from the current one
+
+        Returns:
+            True if a new version was published
+        """
+        records = {station: record.to_dict() for station, record in weather_data.items()}
+        body = json.dumps(records, sort_keys=True).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if etag == self.etag:
+            return False
+
+        async with self.changed:
+            self.records = records
+            self.etag = etag
+            self.version += 1
+            self.generated = time.time()
+            self.changed.notify_all()
+        return True
+
+    def etag_for(self, ids: Optional[List[str]]) -> str:
+        """ETag of a response: the published data's, plus a hash of the station filter if any"""
+        if ids is None:
+            return self.etag
+        station_filter = hashlib.sha1(','.join(ids).encode('utf-8')).hexdigest()[:8]
+        return f'{self.etag[:-1]}-{station_filter}"'
+
+    async def fetch_loop(self):
+        """Fetch upstream on the poll schedule and publish each result"""
+        metrics = self.weather_map.metrics
+        while True:
+            self.upstream_fetches += 1
+            metrics.begin_cycle()
+
+            # requests is blocking - keep it off the event loop
+            weather_data = await asyncio.to_thread(self.weather_map.get_weather_data, self.stations)
+
+            self.last_fetch_ok = bool(weather_data)
+            if weather_data:
+                published = await self.publish(weather_data)
+                self.scheduler.observe(weather_data)
+                self.weather_map.displayed = weather_data
+                if published:
+                    print(f"Published version {self.version} ({len(self.records)} stations, "
+                          f"{self.waiting} clients waiting)")
+                else:
+                    print(f"No change since version {self.version}")
+            else:
+                print("No weather data received - keeping previous state")
+                metrics.error('no_data')
+
+            # Data age is reported for what clients are being served
+            metrics.end_cycle(self.weather_map.displayed)
+
+            await asyncio.sleep(self.scheduler.advance())
+
+    def body(self, ids: Optional[List[str]]) -> bytes:
+        """Serialize the current data, optionally limited to some stations"""
+        records = self.records
+        if ids is not None:
+            records = {station: records[station] for station in ids if station in records}
+        return json.dumps({'generated': self.generated, 'version': self.version,
+                           'stations': records}).encode('utf-8')
+
+    async def handle_metar(self, query: Dict[str, List[str]], headers: Dict[str, str]) -> Tuple:
+        """Answer a /metar.json request, returning (status, headers, body)"""
+        ids = None
+        if query.get('ids'):
+            ids = [station.strip().upper() for station in query['ids'][0].split(',') if station.strip()]
+
+        try:
+            wait = min(float(query.get('wait', ['0'])[0]), MAX_WAIT)
+        except ValueError:
+            return 400, {}, b'wait must be a number of seconds\n'
+
+        client_etag = headers.get('if-none-match')
+        if client_etag == self.etag_for(ids) and wait > 0:
+            # Long poll: hold the request until the data changes or the wait expires
+            self.waiting += 1
+            try:
+                async with self.changed:
+                    await asyncio.wait_for(self.changed.wait_for(lambda: self.etag_for(ids) != client_etag), wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.waiting -= 1
+
+        etag = self.etag_for(ids)
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if client_etag == etag:
+            self.not_modified += 1
+            return 304, response_headers, b''
+
+        response_headers['Content-Type'] = 'application/json'
+        return 200, response_headers, self.body(ids)
+
+    def health(self) -> bytes:
+        return json.dumps({
+            'stations': len(self.stations),
+            'published': len(self.records),
+            'version': self.version,
+            'generated': self.generated,
+            'last_fetch_ok': self.last_fetch_ok,
+            'upstream_fetches': self.upstream_fetches,
+            'requests_served': self.requests_served,
+            'not_modified': self.not_modified,
+            'waiting': self.waiting,
+        }).encode('utf-8')
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one HTTP/1.1 request, then close the connection"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+
+            url = urlsplit(target)
+            if method not in ('GET', 'HEAD'):
+                status, response_headers, body = 405, {'Allow': 'GET, HEAD'}, b''
+            elif url.path in ('/', '/metar.json'):
+                status, response_headers, body = await self.handle_metar(parse_qs(url.query), headers)
+            elif url.path == '/health':
+                status, response_headers, body = 200, {'Content-Type': 'application/json'}, self.health()
+            else:
+                status, response_headers, body = 404, {}, b'Not found\n'
+
+            self.requests_served += 1
+            lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Length: {len(body)}",
+                     "Connection: close"]
+            lines += [f"{name}: {value}" for name, value in response_headers.items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(body)
+            await writer.drain()
+
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, ValueError):
+            pass  # Malformed, slow or dropped client - just close the connection
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '0.0.0.0', port: int = DEFAULT_PORT):
+        """Run the upstream fetcher and the HTTP server until cancelled"""
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_HEADER_BYTES)
+        print(f"Serving {len(self.stations)} stations on http://{host}:{port}/metar.json")
+
+        async with server:
+            fetcher = asyncio.create_task(self.fetch_loop())
+            try:
+                await server.serve_forever()
+            finally:
+                fetcher.cancel()
+
+
+def main():
+    """Main function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local METAR fan-out server')
+    parser.add_argument('--region', action='append', dest='regions',
+                        help='Region profile whose airports are served; repeat for several')
+    parser.add_argument('--stations', nargs='*', default=[],
+                        help='Extra airport codes to serve')
+    parser.add_argument('--host', default='0.0.0.0',
+                        help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='Port to listen on')
+    parser.add_argument('--update-interval', type=int, default=1,
+                        help='Upstream poll interval in minutes around METAR issuance (~:45-:05)')
+    parser.add_argument('--idle-interval', type=int, default=10,
+                        help='Upstream poll interval in minutes between issuance windows')
+    parser.add_argument('--bulk', nargs='?', const=BULK_CSV_URL, default=None, metavar='SOURCE',
+                        help='Read the all-stations METAR dataset instead of querying by airport ID')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='Directory for the API response cache')
+    parser.add_argument('--metrics-dir', default=None, metavar='DIR',
+                        help='Write per-cycle metrics to DIR/metar_server.prom (Prometheus textfile) '
+                             'and DIR/metar_server.json')
+    args = parser.parse_args()
+
+    stations = {}
+    for path in (args.regions or ([] if args.stations else ['ne'])):
+        profile = load_profile(path)
+        if profile.get('bbox'):
+            # Remote maps can't place bbox stations (WeatherMap rejects them)
+            parser.error(f"region {path!r} is a bounding-box region, which can't be served - "
+                         f"run that map against the API directly")
+        stations.update(dict.fromkeys(airport['id'] for airport in profile.get('airports', [])))
+    stations.update(dict.fromkeys(station.upper() for station in args.stations))
+
+    # A map with no regions: only its fetch logic is used
+    weather_map = WeatherMap([], cache_dir=args.cache_dir, bulk_source=args.bulk,
+                             metrics=CycleMetrics('metar_server', args.metrics_dir))
+    scheduler = PollScheduler(dense_interval=args.update_interval * 60,
+                              idle_interval=args.idle_interval * 60)
+    server = FanoutServer(list(stations), weather_map, scheduler)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+
+
+if __name__ == "__main__":
+    main()
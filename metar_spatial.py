@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Bounding boxes and a spatial index of station positions
+A region can be defined by a bounding box instead of an ID list: every
+station reporting inside it comes back from one `bbox=` query, and each LED
+of the map is given the nearest station to its position on the map.
+
+GridIndex buckets stations into square cells of a local equirectangular
+projection (accurate to well under 1% over a region-sized area), so a
+nearest-station lookup only scans the few cells around the query point.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (min_lat, min_lon, max_lat, max_lon), degrees
+BBox = Tuple[float, float, float, float]
+
+KM_PER_DEGREE = 111.195
+
+
+def parse_bbox(value) -> BBox:
+    """
+    Read a bounding box from a profile list or a "minLat,minLon,maxLat,maxLon" string
+
+    Raises:
+        ValueError: Not four numbers, or min above max
+    """
+    parts = value.split(',') if isinstance(value, str) else list(value)
+    if len(parts) != 4:
+        raise ValueError(f"Bounding box needs min_lat, min_lon, max_lat, max_lon: {value!r}")
+    min_lat, min_lon, max_lat, max_lon = (float(part) for part in parts)
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError(f"Bounding box minimum is above its maximum: {value!r}")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def bbox_param(bbox: BBox) -> str:
+    """Format a bounding box as the API's bbox= value"""
+    return ','.join(f"{value:g}" for value in bbox)
+
+
+def in_bbox(lat: Optional[float], lon: Optional[float], bbox: BBox) -> bool:
+    """True if the position is inside the box (False if it is unknown)"""
+    if lat is None or lon is None:
+        return False
+    return bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]
+
+
+def union_bbox(bboxes: Iterable[BBox]) -> Optional[BBox]:
+    """Smallest box covering all the boxes (None if there are none)"""
+    bboxes = list(bboxes)
+    if not bboxes:
+        return None
+    return (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+
+
+class GridIndex:
+    def __init__(self, points: Iterable[Tuple[str, float, float]], cell_km: Optional[float] = None,
+                 ref_lat: Optional[float] = None):
+        """
+        Build the index
+
+        Args:
+            points: (station, lat, lon) per station
+            cell_km: Grid cell size (about one station per cell if None)
+            ref_lat: Latitude the projection is true at (mean latitude if None)
+        """
+        points = list(points)
+        if ref_lat is None:
+            ref_lat = sum(lat for _, lat, _ in points) / len(points) if points else 0.0
+
+        self._kx = KM_PER_DEGREE * math.cos(math.radians(ref_lat))
+        self._ky = KM_PER_DEGREE
+        projected = [(self.project(lat, lon), station) for station, lat, lon in points]
+
+        if cell_km is None and projected:
+            # Cells the size of the mean station spacing keep each lookup to a
+            # ring or two of cells holding a handful of stations
+            xs = [x for (x, _), _ in projected]
+            ys = [y for (_, y), _ in projected]
+            area = max(1.0, (max(xs) - min(xs)) * (max(ys) - min(ys)))
+            cell_km = math.sqrt(area / len(projected))
+        self.cell_km = max(1.0, cell_km or 1.0)
+
+        self.cells: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = {}
+        for (x, y), station in projected:
+            self.cells.setdefault(self._cell(x, y), []).append((x, y, station))
+        self.size = len(points)
+
+        if self.cells:
+            self._min_cx = min(cx for cx, _ in self.cells)
+            self._max_cx = max(cx for cx, _ in self.cells)
+            self._min_cy = min(cy for _, cy in self.cells)
+            self._max_cy = max(cy for _, cy in self.cells)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def project(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Position in km on the index's local projection"""
+        return lon * self._kx, lat * self._ky
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+
+    def nearest(self, lat: float, lon: float, max_km: Optional[float] = None,
+                exclude: Iterable[str] = ()) -> Optional[Tuple[str, float]]:
+        """
+        Find the station nearest to a position
+
+        Args:
+            lat: Latitude, degrees
+            lon: Longitude, degrees
+            max_km: Ignore stations farther than this
+            exclude: Stations to skip (e.g. already assigned)
+
+        Returns:
+            (station, distance in km), or None if there is none in range
+        """
+        if not self.cells:
+            return None
+
+        x, y = self.project(lat, lon)
+        cx, cy = self._cell(x, y)
+        limit = max_km if max_km is not None else math.inf
+        best, best_d2 = None, math.inf
+
+        # Rings of cells around the query cell, from the first one that
+        # reaches the grid to the last one that still overlaps it
+        first_ring = max(0, cx - self._max_cx, self._min_cx - cx, cy - self._max_cy, self._min_cy - cy)
+        last_ring = max(abs(cx - self._min_cx), abs(cx - self._max_cx),
+                        abs(cy - self._min_cy), abs(cy - self._max_cy))
+        cells = self.cells
+        for ring in range(first_ring, last_ring + 1):
+            # Every point in ring r is at least (r - 1) cells away
+            if ring > 1 and (ring - 1) * self.cell_km >= min(math.sqrt(best_d2), limit):
+                break
+            for cell in self._ring(cx, cy, ring):
+                for px, py, station in cells.get(cell, ()):
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < best_d2 and station not in exclude:
+                        best, best_d2 = station, d2
+
+        if best is None or math.sqrt(best_d2) > limit:
+            return None
+        return best, math.sqrt(best_d2)
+
+    def _ring(self, cx: int, cy: int, ring: int) -> List[Tuple[int, int]]:
+        """Cells of the grid at Chebyshev distance `ring` from (cx, cy)"""
+        if ring == 0:
+            return [(cx, cy)]
+        x_range = range(max(cx - ring, self._min_cx), min(cx + ring, self._max_cx) + 1)
+        y_range = range(max(cy - ring + 1, self._min_cy), min(cy + ring - 1, self._max_cy) + 1)
+        cells = []
+        for y in (cy - ring, cy + ring):
+            if self._min_cy <= y <= self._max_cy:
+                cells += [(x, y) for x in x_range]
+        for x in (cx - ring, cx + ring):
+            if self._min_cx <= x <= self._max_cx:
+                cells += [(x, y) for y in y_range]
+        return cells
+
+
+def assign_nearest(index: GridIndex, positions: Dict[int, Tuple[float, float]],
+                   max_km: Optional[float] = None, taken: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Give each LED the nearest station to its map position, one LED per station
+
+    LEDs are served closest pair first, so when two LEDs share a nearest
+    station it goes to the closer one and the other takes its next nearest.
+
+    Args:
+        index: Stations to choose from
+        positions: LED index to (lat, lon) on the map
+        max_km: Leave an LED unassigned if no free station is this close
+        taken: Stations that must not be assigned (e.g. pinned to other LEDs)
+
+    Returns:
+        Station to LED index
+    """
+    taken = set(taken)
+    first_choice = {led: index.nearest(lat, lon, max_km, taken) for led, (lat, lon) in positions.items()}
+    order = sorted((found[1], led) for led, found in first_choice.items() if found is not None)
+
+    mapping = {}
+    for _, led in order:
+        found = first_choice[led]
+        if found[0] in taken:
+            found = index.nearest(*positions[led], max_km, taken)
+            if found is None:
+                continue
+        mapping[found[0]] = led
+        taken.add(found[0])
+    return mapping
+
+
+def led_positions(leds: Sequence[Dict]) -> Dict[int, Tuple[float, float]]:
+    """Read LED map positions from profile entries {"led": 0, "lat": ..., "lon": ...}"""
+    return {int(led['led']): (float(led['lat']), float(led['lon'])) for led in leds}
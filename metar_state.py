@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Last-known-good weather state
+After each successful cycle the map saves every station's flight category
+and observation time to a small binary file, so that after a restart (or a
+power blip with the network still down) the strip can be repainted from it
+within milliseconds instead of staying dark until the first fetch
+
+File layout (little-endian):
+    header   magic 'MLKG', version, record size, saved_at (Unix time), count
+    records  station ID (8 bytes, NUL padded), category code, obs_time (0 = unknown)
+    trailer  CRC32 of everything before it
+
+The file is replaced atomically and synced to disk, so a power cut leaves
+either the old or the new state, never a torn one.
+"""
+
+import os
+import struct
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from metar_category import CATEGORY_CODES, UNKNOWN
+
+MAGIC = b'MLKG'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHdI')
+RECORD = struct.Struct('<8sBxxxI')
+TRAILER = struct.Struct('<I')
+
+# Restored stations are shown at full brightness up to FRESH_SECONDS old and
+# dim linearly to MIN_LEVEL at MAX_AGE_SECONDS; older ones are not restored
+FRESH_SECONDS = 60 * 60
+DEFAULT_MAX_AGE_SECONDS = 12 * 60 * 60
+MIN_LEVEL = 48
+LEVEL_MAX = 255
+
+
+class SavedState(NamedTuple):
+    saved_at: float
+    stations: Dict[str, Tuple[int, int]]  # Station -> (category code, obs_time)
+
+
+def age_level(age_seconds: float, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS) -> int:
+    """Animation level (0-255) a restored station is painted at, by observation age"""
+    if age_seconds <= FRESH_SECONDS:
+        return LEVEL_MAX
+    fraction = min(1.0, (age_seconds - FRESH_SECONDS) / max(1.0, max_age_seconds - FRESH_SECONDS))
+    return round(LEVEL_MAX - (LEVEL_MAX - MIN_LEVEL) * fraction)
+
+
+class StateFile:
+    def __init__(self, path: str):
+        """
+        Initialize the state file
+
+        Args:
+            path: Location of the binary state file
+        """
+        self.path = path
+        self.saves = 0
+        self.skipped_saves = 0
+        self._last_body: Optional[bytes] = None
+
+    def encode(self, weather_data: Dict, now: Optional[float] = None) -> bytes:
+        """Pack weather data into the file format"""
+        body = bytearray()
+        count = 0
+        for station, data in weather_data.items():
+            encoded = station.encode('ascii', 'ignore')
+            if not encoded or len(encoded) > 8:
+                continue
+            code = getattr(data, 'category_code', None)
+            if code is None:
+                code = CATEGORY_CODES.get(data.get('flight_category'), UNKNOWN)
+            obs_time = data.get('obs_time') if isinstance(data, dict) else getattr(data, 'obs_time', None)
+            body += RECORD.pack(encoded, code, int(obs_time or 0) & 0xFFFFFFFF)
+            count += 1
+
+        data = HEADER.pack(MAGIC, VERSION, RECORD.size, now if now is not None else time.time(), count) + body
+        return data + TRAILER.pack(zlib.crc32(data))
+
+    def save(self, weather_data: Dict, now: Optional[float] = None) -> bool:
+        """
+        Atomically replace the state file, unless the stations are unchanged
+
+        Returns:
+            True if the file was written
+        """
+        data = self.encode(weather_data, now)
+        body = data[HEADER.size:-TRAILER.size]
+        if body == self._last_body:
+            # Same categories and observation times - spare the SD card
+            self.skipped_saves += 1
+            return False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        # Make the rename itself durable
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+        self._last_body = body
+        self.saves += 1
+        return True
+
+    def load(self) -> Optional[SavedState]:
+        """Read the state file; None if it is missing, truncated or corrupt"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < HEADER.size + TRAILER.size:
+            return None
+        (crc,) = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if zlib.crc32(data[:-TRAILER.size]) != crc:
+            return None
+
+        magic, version, record_size, saved_at, count = HEADER.unpack_from(data)
+        if (magic != MAGIC or version != VERSION or record_size != RECORD.size or
+                HEADER.size + count * RECORD.size + TRAILER.size != len(data)):
+            return None
+
+        stations = {}
+        for station, code, obs_time in RECORD.iter_unpack(data[HEADER.size:-TRAILER.size]):
+            stations[station.rstrip(b'\0').decode('ascii')] = (code if code <= UNKNOWN else UNKNOWN, obs_time)
+
+        # A save of the same stations later in this process can be skipped
+        self._last_body = data[HEADER.size:-TRAILER.size]
+        return SavedState(saved_at, stations)
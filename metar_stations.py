@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Station metadata table
+Maps every station aviationweather.gov knows to its ICAO ID, FAA location
+identifier, name, position and whether it reports METARs. The all-stations
+cache file is downloaded rarely (stations change slowly) and kept as a
+compact tab-separated file next to the response cache, which loads into a
+dictionary index in a few milliseconds at startup.
+
+Profiles can then list a station by whichever ID is on the chart: FAA-only
+IDs such as `6A2` or `K6A2` resolve to the ID the API answers to, and codes
+that can never return a METAR are left out of the request.
+"""
+
+import gzip
+import io
+import json
+import os
+import time
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from metar_http import FetchClient, get_client
+
+STATIONS_URL = "https://aviationweather.gov/data/cache/stations.cache.json.gz"
+STATIONS_FILE_NAME = 'stations.tsv'
+DEFAULT_REFRESH_DAYS = 30
+
+GZIP_MAGIC = b'\x1f\x8b'
+FILE_HEADER = '# icao\tfaa\tmetar\tlat\tlon\tname'
+
+
+class Station(NamedTuple):
+    icao: str
+    faa: str
+    name: str
+    lat: Optional[float]
+    lon: Optional[float]
+    metar: bool
+
+    @property
+    def query_id(self) -> str:
+        """ID to request the station's METARs by (and the one data comes back under)"""
+        return self.icao or self.faa
+
+
+class MappingCheck(NamedTuple):
+    # Airport code to LED, with codes renamed to their query IDs
+    mapping: Dict[str, int]
+    # Profile code to the query ID it was renamed to
+    renamed: Dict[str, str]
+    # Code (as in mapping) to the query ID of a station already mapped under
+    # that ID, whose data its LED shows too
+    aliases: Dict[str, str]
+    # Code (as in mapping) to why it can't return data
+    unavailable: Dict[str, str]
+
+
+def _coordinate(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_row(station: Station) -> List[str]:
+    """Table file fields for a station (see FILE_HEADER)"""
+    return [station.icao, station.faa, '1' if station.metar else '0',
+            '' if station.lat is None else f"{station.lat:g}",
+            '' if station.lon is None else f"{station.lon:g}",
+            station.name.replace('\t', ' ')]
+
+
+def _from_row(row: Sequence[str]) -> Station:
+    icao, faa, metar, lat, lon, name = row
+    return Station(icao, faa, name, _coordinate(lat), _coordinate(lon), metar == '1')
+
+
+def iter_station_records(stream: BinaryIO) -> Iterator[Station]:
+    """
+    Read stations from the (possibly gzipped) stations.cache.json dataset
+
+    Entries are JSON objects like the stationinfo API's:
+    {"icaoId": "KBOS", "faaId": "BOS", "site": "Boston/Logan Intl",
+     "lat": 42.36, "lon": -71.01, "siteType": ["METAR", "TAF"], ...}
+    """
+    data = stream.read()
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+
+    for entry in json.loads(data):
+        icao = (entry.get('icaoId') or '').strip().upper()
+        faa = (entry.get('faaId') or '').strip().upper()
+        if not icao and not faa:
+            continue
+
+        site_type = entry.get('siteType') or []
+        if isinstance(site_type, str):
+            site_type = site_type.split(',')
+        yield Station(icao, faa, (entry.get('site') or '').strip(),
+                      _coordinate(entry.get('lat')), _coordinate(entry.get('lon')),
+                      any(kind.strip().upper() == 'METAR' for kind in site_type))
+
+
+class StationIndex:
+    def __init__(self, rows: Iterable[Sequence[str]], saved_at: Optional[float] = None):
+        """
+        Lookup index over the station table
+
+        Rows are kept as the table file's fields and only turned into
+        Stations when looked up, which keeps loading ~10k stations at
+        startup to a few milliseconds.
+
+        Args:
+            rows: Table file fields per station (see FILE_HEADER)
+            saved_at: When the table was downloaded (now if None)
+        """
+        self.by_icao: Dict[str, Sequence[str]] = {}
+        self.by_faa: Dict[str, Sequence[str]] = {}
+        self.size = 0
+        for row in rows:
+            self.size += 1
+            if row[0]:
+                self.by_icao[row[0]] = row
+            if row[1]:
+                # Prefer the METAR-reporting entry when an LID is listed twice
+                known = self.by_faa.get(row[1])
+                if known is None or (row[2] == '1' and known[2] != '1'):
+                    self.by_faa[row[1]] = row
+        self.saved_at = saved_at if saved_at is not None else time.time()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, code: str) -> bool:
+        return self.resolve(code) is not None
+
+    def resolve(self, code: str) -> Optional[Station]:
+        """
+        Look up a station by ICAO ID or FAA location identifier
+
+        A four-character code starting with K that is not an ICAO ID (e.g.
+        K6A2) is tried as the FAA LID without the K, as charts and older
+        profiles often write them.
+
+        Returns:
+            The station, or None if it is unknown
+        """
+        code = code.strip().upper()
+        row = self.by_icao.get(code) or self.by_faa.get(code)
+        if row is None and len(code) == 4 and code[0] == 'K':
+            row = self.by_faa.get(code[1:])
+        return _from_row(row) if row is not None else None
+
+    def check_mapping(self, airport_mapping: Dict[str, int]) -> MappingCheck:
+        """
+        Resolve a profile's airport codes to the IDs the API answers to
+
+        Codes that are unknown or don't report METARs are kept (so their
+        LEDs still show as unknown) but listed as unavailable, so they can
+        be left out of requests. A second code for a station already mapped
+        (ATL next to KATL) is kept as an alias of its query ID, so its LED
+        shows that station's data without requesting it twice.
+
+        Args:
+            airport_mapping: Airport code to LED index
+
+        Returns:
+            MappingCheck of the resolved mapping, renamed, alias and unavailable codes
+        """
+        mapping: Dict[str, int] = {}
+        renamed: Dict[str, str] = {}
+        aliases: Dict[str, str] = {}
+        unavailable: Dict[str, str] = {}
+
+        resolved = [(code, led_index, self.resolve(code)) for code, led_index in airport_mapping.items()]
+        # Codes already in query form claim their ID first, so an alias
+        # listed before its station doesn't take the station's key
+        resolved.sort(key=lambda entry: entry[2] is None or entry[2].query_id != entry[0])
+
+        for code, led_index, station in resolved:
+            if station is None:
+                mapping[code] = led_index
+                unavailable[code] = "is not a known station"
+                continue
+            if not station.metar:
+                mapping[code] = led_index
+                unavailable[code] = f"({station.name}) does not report METARs"
+                continue
+
+            query_id = station.query_id
+            if query_id in mapping:
+                mapping[code] = led_index
+                aliases[code] = query_id
+                continue
+
+            mapping[query_id] = led_index
+            if query_id != code:
+                renamed[code] = query_id
+
+        return MappingCheck(mapping, renamed, aliases, unavailable)
+
+
+class StationTable:
+    def __init__(self, path: str, url: str = STATIONS_URL, refresh_days: float = DEFAULT_REFRESH_DAYS,
+                 client: Optional[FetchClient] = None):
+        """
+        Locally stored station table
+
+        Args:
+            path: Local table file
+            url: All-stations dataset URL, or a local .json / .json.gz path
+            refresh_days: Download a new table once the local one is this old
+            client: Pooled HTTP client (shared client if None)
+        """
+        self.path = path
+        self.url = url
+        self.refresh_seconds = refresh_days * 24 * 60 * 60
+        self._client = client
+
+    def age(self) -> Optional[float]:
+        """Seconds since the local table was written (None if there is none)"""
+        try:
+            return time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def stale(self) -> bool:
+        """True if there is no local table or it is due a refresh"""
+        age = self.age()
+        return age is None or age > self.refresh_seconds
+
+    def load(self) -> Optional[StationIndex]:
+        """Load the local table (None if missing or unreadable)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved_at = os.fstat(f.fileno()).st_mtime
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+
+        rows = [fields for fields in (line.split('\t') for line in lines if line and not line.startswith('#'))
+                if len(fields) == 6]
+        if not rows:
+            return None
+        return StationIndex(rows, saved_at)
+
+    def refresh(self, timeout: int = 60) -> StationIndex:
+        """
+        Download the dataset and replace the local table
+
+        Raises:
+            OSError, requests.RequestException, ValueError: Download, write or
+            parse failure (the previous table is kept)
+        """
+        if self.url.startswith(('http://', 'https://')):
+            client = self._client or get_client()
+            response = client.get(self.url, timeout=timeout)
+            response.raise_for_status()
+            stations = list(iter_station_records(io.BytesIO(response.content)))
+        else:
+            with open(self.url, 'rb') as f:
+                stations = list(iter_station_records(f))
+        if not stations:
+            raise ValueError(f"No stations in {self.url}")
+
+        rows = [_to_row(station) for station in stations]
+        self._write(rows)
+        return StationIndex(rows)
+
+    def _write(self, rows: List[List[str]]):
+        """Write the table so readers never see a partial file"""
+        lines = [FILE_HEADER] + ['\t'.join(row) for row in rows]
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Incremental parsing of the METAR API's JSON array response
+Decodes one METAR object at a time from the body chunks as they arrive,
+keeps only the fields the fetchers use, and drops records that are not the
+most recent for their station - so peak memory is one record plus one
+chunk instead of the whole response
+"""
+
+import codecs
+import json
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional
+
+# Fields kept from each METAR object (including the nested cloud layers)
+METAR_FIELDS = frozenset({
+    'icaoId', 'mostRecent', 'rawOb', 'name', 'reportTime', 'obsTime', 'metarType',
+    'visib', 'clouds', 'cover', 'base', 'temp', 'dewp', 'wdir', 'wspd', 'wgst',
+    'altim', 'wxString', 'lat', 'lon',
+})
+
+CHUNK_SIZE = 16384
+WHITESPACE = ' \t\r\n'
+NUMBER_CHARS = '0123456789.eE+-'
+
+
+def iter_json_array(chunks: Iterable[bytes], fields: Optional[FrozenSet[str]] = None) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array as its bytes arrive
+
+    Args:
+        chunks: Body chunks (e.g. response.iter_content())
+        fields: Keep only these keys in every decoded object; all if None
+
+    Raises:
+        json.JSONDecodeError: The body is not a well-formed JSON array
+    """
+    def keep_fields(pairs):
+        return {key: value for key, value in pairs if key in fields}
+
+    decoder = json.JSONDecoder(object_pairs_hook=keep_fields if fields is not None else None)
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+
+    buf = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        while pos < len(buf) and (buf[pos] in WHITESPACE or (started and buf[pos] == ',')):
+            pos += 1
+
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[':
+                    raise json.JSONDecodeError("Expected a JSON array", buf, pos)
+                started = True
+                pos += 1
+                continue
+
+            if buf[pos] == ']':
+                return
+
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Most likely an element split across chunks - read more
+                if eof:
+                    raise
+            else:
+                # A number followed only by number characters may continue in
+                # the next chunk ("12" + "34", "-6." + "5"); every other value
+                # ends in a character that closes it
+                if eof or isinstance(value, bool) or not isinstance(value, (int, float)) \
+                        or buf[end:].strip(NUMBER_CHARS):
+                    pos = end
+                    yield value
+                    continue
+        elif eof:
+            raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+
+        # Need more data: drop what has been consumed and append the next chunk
+        buf = buf[pos:]
+        pos = 0
+        try:
+            buf += text_decoder.decode(next(chunks))
+        except StopIteration:
+            buf += text_decoder.decode(b'', final=True)
+            eof = True
+
+
+def iter_metar_records(chunks: Iterable[bytes], fields: FrozenSet[str] = METAR_FIELDS,
+                       most_recent_only: bool = True) -> Iterator[Dict]:
+    """
+    Yield METAR records from an API response body as it streams in
+
+    Args:
+        chunks: Body chunks
+        fields: Keys kept from each record
+        most_recent_only: Drop records other than each station's latest
+    """
+    for record in iter_json_array(chunks, fields):
+        if most_recent_only and record.get('mostRecent') != 1:
+            continue
+        yield record
+
+
+def iter_file_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a file's contents in chunks"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
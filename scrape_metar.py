@@ -4,16 +4,42 @@ METAR Flight Category Scraper
 Fetches METAR data from aviationweather.gov and determines flight categories
 """
 
-import requests
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import sys
 from datetime import datetime
 
+from metar_bulk import BULK_CSV_URL, load_snapshot
+from metar_chunks import DEFAULT_MAX_IDS, DEFAULT_MAX_WORKERS, ChunkFailure, chunk_ids, fetch_chunked
+from metar_category import classify_batch, flight_category, parse_ceiling, parse_visibility
+from metar_http import FetchClient, get_client, requests
+from metar_metrics import CycleMetrics
+from metar_records import METARRecord
+from metar_spatial import BBox, bbox_param, parse_bbox
+from metar_stream import CHUNK_SIZE, iter_metar_records
+
 
 class METARScraper:
-    def __init__(self):
+    def __init__(self, client: Optional[FetchClient] = None, bulk_source: Optional[str] = None,
+                 metrics: Optional[CycleMetrics] = None, max_ids_per_request: int = DEFAULT_MAX_IDS,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
         self.base_url = "https://aviationweather.gov/api/data/metar"
+        self.client = client or get_client()
+
+        # All-stations dataset URL or local file used instead of per-ID queries
+        self.bulk_source = bulk_source
+
+        # Long station lists are split into requests of at most this many
+        # IDs, fetched max_workers at a time
+        self.max_ids_per_request = max_ids_per_request
+        self.max_workers = max_workers
+
+        # Requests that failed in the last fetch; their stations are missing
+        # from its result
+        self.failed_chunks: List[ChunkFailure] = []
+
+        # Stage timings, bytes and errors of each fetch
+        self.metrics = metrics or CycleMetrics('metar_scraper')
 
     def get_metar_data(self, airport_codes: List[str], hours: int = 1) -> Dict:
         """
@@ -24,102 +50,177 @@ class METARScraper:
             hours: How many hours back to fetch data (default: 1)
 
         Returns:
-            Dictionary with airport codes as keys and METAR data as values
+            Dictionary with airport codes as keys and METAR data as values;
+            stations of requests that failed (see failed_chunks) are missing
+        """
+        with self.metrics.fetch():
+            return self._fetch_metar_data(airport_codes, hours)
+
+    def get_bbox_metar_data(self, bbox: BBox, hours: int = 1) -> Dict:
         """
-        # Convert airport codes to comma-separated string
-        ids = ','.join(airport_codes)
+        Fetch METAR data for every station inside a bounding box in one request
+
+        With a bulk source the dataset is read instead and filtered to the box.
 
-        params = {
-            'ids': ids,
+        Args:
+            bbox: (min_lat, min_lon, max_lat, max_lon)
+            hours: How many hours back to fetch data (default: 1)
+
+        Returns:
+            Dictionary with airport codes as keys and METAR data as values
+        """
+        with self.metrics.fetch():
+            self.failed_chunks = []
+            if self.bulk_source:
+                return self.get_bulk_metar_data([], bbox)
+            try:
+                return self._fetch_query({'bbox': bbox_param(bbox)}, hours)
+            except Exception as e:
+                self._report_failure(ChunkFailure(0, [], e), 1)
+                return {}
+
+    def _fetch_metar_data(self, airport_codes: List[str], hours: int) -> Dict:
+        """Fetch from the bulk dataset or the API"""
+        self.failed_chunks = []
+        if self.bulk_source:
+            return self.get_bulk_metar_data(airport_codes)
+
+        # Size-bounded requests, fetched concurrently when there are several
+        chunks = chunk_ids(airport_codes, max_ids=self.max_ids_per_request)
+        if len(chunks) > 1:
+            print(f"Fetching {sum(len(chunk) for chunk in chunks)} airports in {len(chunks)} requests, "
+                  f"{min(self.max_workers, len(chunks))} at a time")
+
+        # Each request times its own stages
+        with self.metrics.offloaded():
+            metar_data, self.failed_chunks = fetch_chunked(
+                chunks, lambda chunk: self._fetch_chunk(chunk, hours), self.max_workers)
+
+        for failure in self.failed_chunks:
+            self._report_failure(failure, len(chunks))
+        if self.failed_chunks and metar_data:
+            missing = sum(len(failure.stations) for failure in self.failed_chunks)
+            print(f"Partial data: {len(self.failed_chunks)} of {len(chunks)} requests failed, "
+                  f"{missing} airports missing")
+
+        return metar_data
+
+    def _fetch_chunk(self, airport_codes: List[str], hours: int) -> Dict:
+        """Fetch one request's worth of airports; raises on failure"""
+        return self._fetch_query({'ids': ','.join(airport_codes)}, hours)
+
+    def _fetch_query(self, query: Dict, hours: int) -> Dict:
+        """Fetch the stations selected by `ids` or `bbox`; raises on failure"""
+        params = dict(query, **{
             'format': 'json',
             'taf': 'false',
             'hours': hours
-        }
+        })
+
+        with self.metrics.stage('request'):
+            with self.client.get(self.base_url, params=params, timeout=10, stream=True) as response:
+                response.raise_for_status()
+
+                # Parse the JSON response as it streams in, keeping only the
+                # most recent report per station
+                with self.metrics.stage('parse'):
+                    chunks = self.metrics.metered(response.iter_content(CHUNK_SIZE))
+                    return self._metar_from_records(iter_metar_records(chunks))
+
+    def _report_failure(self, failure: ChunkFailure, chunk_count: int):
+        """Print and count one failed request"""
+        where = ''
+        if chunk_count > 1:
+            where = (f" for request {failure.index + 1}/{chunk_count} "
+                     f"({failure.stations[0]}-{failure.stations[-1]}, {len(failure.stations)} airports)")
+
+        if isinstance(failure.error, requests.RequestException):
+            print(f"Error fetching data{where}: {failure.error}")
+            self.metrics.error('fetch')
+        elif isinstance(failure.error, json.JSONDecodeError):
+            print(f"Error parsing JSON{where}: {failure.error}")
+            self.metrics.error('parse')
+        else:
+            print(f"Unexpected error{where}: {failure.error}")
+            self.metrics.error('unexpected')
 
+    def get_bulk_metar_data(self, airport_codes: List[str], bbox: Optional[BBox] = None) -> Dict:
+        """
+        Read METAR data for given airport codes from the all-stations dataset
+
+        Args:
+            airport_codes: List of 4-letter airport codes
+            bbox: Also read every station inside this box
+
+        Returns:
+            Dictionary with airport codes as keys and METAR data as values
+        """
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-
-            # Parse JSON response
-            data = response.json()
-
-            # Process METAR data
-            metar_data = {}
-            for metar in data:
-                if metar.get('mostRecent') == 1:  # Only get most recent data
-                    station_id = metar.get('icaoId')
-                    if station_id:
-                        # Extract visibility in statute miles
-                        visibility = self._parse_visibility(metar.get('visib'))
-
-                        # Extract ceiling from clouds data
-                        ceiling = self._parse_ceiling(metar.get('clouds', []))
-
-                        # Calculate flight category
-                        flight_category = self._calculate_flight_category(visibility, ceiling)
-
-                        metar_data[station_id] = {
-                            'raw_text': metar.get('rawOb', 'N/A'),
-                            'flight_category': flight_category,
-                            'visibility_mi': visibility,
-                            'ceiling_ft': ceiling,
-                            'temp': metar.get('temp'),
-                            'dewp': metar.get('dewp'),
-                            'wind_dir': metar.get('wdir'),
-                            'wind_speed': metar.get('wspd'),
-                            'altimeter': metar.get('altim'),
-                            'report_time': metar.get('reportTime'),
-                            'station_name': metar.get('name', 'Unknown')
-                        }
-
-            return metar_data
+            snapshot = load_snapshot(self.bulk_source, stations=None if bbox else airport_codes,
+                                     client=self.client, metrics=self.metrics)
+            with self.metrics.stage('parse'):
+                records = snapshot.select(airport_codes)
+                if bbox:
+                    records += snapshot.within(bbox)
+                return self._metar_from_records(records)
 
         except requests.RequestException as e:
             print(f"Error fetching data: {e}")
+            self.metrics.error('fetch')
             return {}
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {e}")
+        except Exception as e:
+            print(f"Error parsing bulk dataset: {e}")
+            self.metrics.error('parse')
             return {}
 
-    def _parse_visibility(self, visib_str: str) -> float:
-        """Parse visibility string to numeric value in statute miles"""
-        if not visib_str:
-            return 99.0  # Default high visibility
-
-        visib_str = str(visib_str).strip()
-
-        # Handle "10+" case
-        if visib_str == "10+":
-            return 10.0
-
-        # Handle numeric values
-        try:
-            return float(visib_str)
-        except ValueError:
-            # Handle fractions like "1/2", "3/4", etc.
-            if '/' in visib_str:
-                parts = visib_str.split('/')
-                if len(parts) == 2:
-                    try:
-                        return float(parts[0]) / float(parts[1])
-                    except ValueError:
-                        pass
-            return 10.0  # Default if can't parse
+    def _metar_from_records(self, data: Iterable[Dict]) -> Dict:
+        """Build per-airport METAR data from API-shaped METAR records"""
+        metar_data = {}
+        for metar in data:
+            if metar.get('mostRecent') == 1:  # Only get most recent data
+                station_id = metar.get('icaoId')
+                if station_id:
+                    # Extract visibility in statute miles
+                    visibility = self._parse_visibility(metar.get('visib'))
+
+                    # Extract ceiling from clouds data
+                    ceiling = self._parse_ceiling(metar.get('clouds', []))
+
+                    # Flight category is classified below in one batch
+                    metar_data[station_id] = METARRecord(
+                        station_id,
+                        raw_text=metar.get('rawOb', 'N/A'),
+                        visibility_mi=visibility,
+                        ceiling_ft=ceiling,
+                        temp=metar.get('temp'),
+                        dewp=metar.get('dewp'),
+                        wind_dir=metar.get('wdir'),
+                        wind_speed=metar.get('wspd'),
+                        altimeter=metar.get('altim'),
+                        report_time=metar.get('reportTime'),
+                        obs_time=metar.get('obsTime'),
+                        station_name=metar.get('name', 'Unknown')
+                    )
+
+        # Calculate flight categories for every station at once
+        with self.metrics.stage('classify'):
+            records = list(metar_data.values())
+            codes = classify_batch([record.visibility_mi for record in records],
+                                   [record.ceiling_ft for record in records])
+            for record, code in zip(records, codes):
+                record.category_code = int(code)
+
+        return metar_data
+
+    def _parse_visibility(self, visib_str: str) -> Optional[float]:
+        """Parse visibility string to numeric value in statute miles (None if not reported)"""
+        return parse_visibility(visib_str)
 
     def _parse_ceiling(self, clouds: List[Dict]) -> Optional[int]:
         """Extract ceiling height from clouds data"""
-        if not clouds:
-            return None
-
-        # Look for overcast (OVC) or broken (BKN) layers
-        for cloud in clouds:
-            cover = cloud.get('cover', '').upper()
-            if cover in ['OVC', 'BKN'] and cloud.get('base') is not None:
-                return int(cloud.get('base'))
-
-        return None  # No ceiling found
+        return parse_ceiling(clouds)
 
-    def _calculate_flight_category(self, visibility: float, ceiling: Optional[int]) -> str:
+    def _calculate_flight_category(self, visibility: Optional[float], ceiling: Optional[int]) -> str:
         """
         Calculate flight category based on visibility and ceiling
 
@@ -128,18 +229,9 @@ class METARScraper:
         - MVFR: Ceiling 1000-3000 ft OR Visibility 3-5 mi
         - IFR: Ceiling 500-999 ft OR Visibility 1-3 mi
         - LIFR: Ceiling < 500 ft OR Visibility < 1 mi
+        - UNKNOWN: Neither visibility nor ceiling reported
         """
-        # Use high ceiling if no ceiling reported (clear skies)
-        ceiling_ft = ceiling if ceiling is not None else 9999
-
-        if ceiling_ft < 500 or visibility < 1:
-            return 'LIFR'
-        elif ceiling_ft < 1000 or visibility < 3:
-            return 'IFR'
-        elif ceiling_ft <= 3000 or visibility <= 5:
-            return 'MVFR'
-        else:
-            return 'VFR'
+        return flight_category(visibility, ceiling)
 
     def print_flight_categories(self, metar_data: Dict):
         """Print formatted flight category information"""
@@ -151,7 +243,7 @@ class METARScraper:
         print("-" * 85)
 
         for airport, data in metar_data.items():
-            visibility = f"{data['visibility_mi']:.1f} mi" if data['visibility_mi'] else "N/A"
+            visibility = f"{data['visibility_mi']:.1f} mi" if data['visibility_mi'] is not None else "N/A"
             ceiling = f"{data['ceiling_ft']} ft" if data['ceiling_ft'] else "Clear"
 
             # Format report time
@@ -312,15 +404,52 @@ def main():
         'KBOS',  # Boston Logan, MA
         'KOWD',  # Norwood, MA
     ]    # You can also get airports from command line arguments
-    if len(sys.argv) > 1:
-        airports = [arg.upper() for arg in sys.argv[1:]]
-
-    scraper = METARScraper()
-
-    print(f"Fetching METAR data for airports: {', '.join(airports)}")
+    args = sys.argv[1:]
+
+    # --bulk[=SOURCE] reads the all-stations dataset instead of querying by ID
+    bulk_source = None
+    for arg in list(args):
+        if arg == '--bulk' or arg.startswith('--bulk='):
+            bulk_source = arg.split('=', 1)[1] if '=' in arg else BULK_CSV_URL
+            args.remove(arg)
+
+    # --metrics-dir=DIR writes this run's metrics as a Prometheus textfile and JSON
+    metrics_dir = None
+    for arg in list(args):
+        if arg.startswith('--metrics-dir='):
+            metrics_dir = arg.split('=', 1)[1]
+            args.remove(arg)
+
+    # --max-ids=N / --workers=N bound each request and the requests in flight
+    limits = {}
+    for arg in list(args):
+        for option, key in (('--max-ids=', 'max_ids_per_request'), ('--workers=', 'max_workers')):
+            if arg.startswith(option):
+                limits[key] = int(arg.split('=', 1)[1])
+                args.remove(arg)
+
+    # --bbox=minLat,minLon,maxLat,maxLon fetches every station in the box instead
+    bbox = None
+    for arg in list(args):
+        if arg.startswith('--bbox='):
+            bbox = parse_bbox(arg.split('=', 1)[1])
+            args.remove(arg)
+
+    if args:
+        airports = [arg.upper() for arg in args]
+
+    scraper = METARScraper(bulk_source=bulk_source, metrics=CycleMetrics('metar_scraper', metrics_dir), **limits)
+
+    if bbox:
+        print(f"Fetching METAR data for every station in {bbox_param(bbox)}")
+    else:
+        print(f"Fetching METAR data for airports: {', '.join(airports)}")
     print("=" * 85)
 
-    metar_data = scraper.get_metar_data(airports)
+    metar_data = scraper.get_bbox_metar_data(bbox) if bbox else scraper.get_metar_data(airports)
+    if not metar_data:
+        scraper.metrics.error('no_data')
+    scraper.metrics.end_cycle(metar_data)
 
     if metar_data:
         scraper.print_flight_categories(metar_data)
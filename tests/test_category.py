@@ -0,0 +1,47 @@
+"""classify_batch() must agree with flight_category() on every threshold"""
+
+import itertools
+import math
+
+import pytest
+
+from metar_category import CATEGORY_CODES, NUMPY_MIN_BATCH, classify_batch, flight_category
+
+NAN = float('nan')
+
+# Each category boundary, both sides of it, and missing values
+VISIBILITIES = [None, NAN, 0, 0.5, 0.99, 1, 1.5, 2.99, 3, 4, 5, 5.01, 10]
+CEILINGS = [None, NAN, 0, 400, 499, 500, 999, 1000, 2000, 3000, 3001, 12000]
+
+PAIRS = list(itertools.product(VISIBILITIES, CEILINGS))
+
+
+def expected_codes(pairs):
+    return [CATEGORY_CODES[flight_category(vis, ceil)] for vis, ceil in pairs]
+
+
+def test_no_visibility_and_no_ceiling_is_unknown():
+    for vis, ceil in itertools.product([None, NAN], [None, NAN]):
+        assert flight_category(vis, ceil) == 'UNKNOWN'
+
+
+def test_missing_visibility_leaves_ceiling_to_decide():
+    assert flight_category(None, 400) == 'LIFR'
+    assert flight_category(NAN, 800) == 'IFR'
+    assert flight_category(None, 3000) == 'MVFR'
+    assert flight_category(None, 3001) == 'VFR'
+
+
+def test_python_batch_matches_scalar():
+    pairs = PAIRS[:NUMPY_MIN_BATCH - 1]
+    codes = classify_batch([vis for vis, _ in pairs], [ceil for _, ceil in pairs])
+    assert isinstance(codes, bytearray)
+    assert list(codes) == expected_codes(pairs)
+
+
+def test_numpy_batch_matches_scalar():
+    np = pytest.importorskip('numpy')
+    pairs = PAIRS * math.ceil(NUMPY_MIN_BATCH / len(PAIRS))
+    codes = classify_batch([vis for vis, _ in pairs], [ceil for _, ceil in pairs])
+    assert isinstance(codes, np.ndarray)
+    assert codes.tolist() == expected_codes(pairs)
@@ -0,0 +1,35 @@
+"""Airports listed in a bounding-box region are fetched even outside its box"""
+
+from metar_map import Region, WeatherMap
+
+HEADER = "raw_text,station_id,observation_time,latitude,longitude,visibility_statute_mi,sky_cover,cloud_base_ft_agl"
+ROWS = [
+    "KBOS 181254Z 27015KT 10SM BKN025 10/05 A3000,KBOS,2026-10-18T12:54:00Z,42.36,-71.01,10+,BKN,2500",
+    "KORH 181254Z VRB03KT 1/2SM FG OVC003 08/08 A2990,KORH,2026-10-18T12:54:00Z,42.27,-71.87,0.5,OVC,300",
+    "KPVD 181251Z 00000KT 10SM CLR 12/04 A3001,KPVD,2026-10-18T12:51:00Z,41.72,-71.43,10+,CLR,",
+]
+
+# Around Boston only; KORH and KPVD lie outside
+BBOX = (42.0, -71.5, 42.6, -70.5)
+
+
+def make_map(tmp_path):
+    source = tmp_path / 'metars.cache.csv'
+    source.write_text('\n'.join([HEADER] + ROWS) + '\n')
+    region = Region('Boston', {'KORH': 0}, led_count=2, backend='terminal',
+                    bbox=BBOX, positions={1: (42.36, -71.01)})
+    return WeatherMap([region], cache_dir=str(tmp_path / 'cache'), bulk_source=str(source))
+
+
+def test_pinned_station_is_requested(tmp_path):
+    assert make_map(tmp_path).stations() == ['KORH']
+
+
+def test_bulk_selection_adds_pinned_station_outside_box(tmp_path):
+    weather_map = make_map(tmp_path)
+    weather_data = weather_map.get_weather_data(weather_map.stations())
+    assert set(weather_data) == {'KBOS', 'KORH'}
+
+    region = weather_map.regions[0]
+    assert region.assign_stations(weather_data)
+    assert region.airport_mapping == {'KORH': 0, 'KBOS': 1}
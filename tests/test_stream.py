@@ -0,0 +1,73 @@
+"""iter_json_array() must decode the same records wherever the chunks split"""
+
+import json
+
+import pytest
+
+from metar_stream import METAR_FIELDS, iter_json_array, iter_metar_records
+
+RECORDS = [
+    {"icaoId": "KBOS", "mostRecent": 1, "rawOb": "KBOS 121854Z 27015G25KT 10SM FEW050 BKN250 M02/M14 A2998",
+     "visib": "10+", "temp": -2.2, "clouds": [{"cover": "FEW", "base": 5000}, {"cover": "BKN", "base": 25000}]},
+    # Brackets, commas, braces, escaped quotes and backslashes inside strings
+    {"icaoId": "KORH", "mostRecent": 1, "name": "Worcester, MA [\"Rgnl\"] {a,b} C:\\path\\",
+     "visib": "1 1/2", "clouds": []},
+    # \u escapes (a surrogate pair when escaped) and raw multi-byte UTF-8
+    {"icaoId": "LFPG", "mostRecent": 0, "name": "Paris \u00e9 Charles-de-Gaulle \U0001F680 \u00fc",
+     "site": "ignored", "wxString": "-RA BR", "lat": 49.0128, "lon": 2.55},
+    {"icaoId": "KJFK", "mostRecent": 1, "visib": 0.25, "wgst": None, "clouds": [{"cover": "OVC", "base": 200}]},
+]
+
+
+def body(ensure_ascii: bool) -> bytes:
+    # Whitespace between every token, as pretty-printed responses have
+    return json.dumps(RECORDS, ensure_ascii=ensure_ascii, indent=1).encode('utf-8')
+
+
+@pytest.mark.parametrize('ensure_ascii', [True, False], ids=['escaped', 'utf8'])
+def test_every_two_way_split(ensure_ascii):
+    data = body(ensure_ascii)
+    for offset in range(len(data) + 1):
+        assert list(iter_json_array([data[:offset], data[offset:]])) == RECORDS, offset
+
+
+@pytest.mark.parametrize('ensure_ascii', [True, False], ids=['escaped', 'utf8'])
+def test_single_byte_chunks(ensure_ascii):
+    data = body(ensure_ascii)
+    assert list(iter_json_array(data[i:i + 1] for i in range(len(data)))) == RECORDS
+
+
+def test_three_way_splits_inside_strings_and_escapes():
+    data = body(False)
+    # Offsets around every quote, backslash and multi-byte character
+    offsets = sorted({i + d for i, byte in enumerate(data) if byte in b'"\\' or byte >= 0x80
+                      for d in (0, 1, 2) if i + d <= len(data)})
+    for first in offsets:
+        for second in offsets:
+            if second >= first:
+                chunks = [data[:first], data[first:second], data[second:]]
+                assert list(iter_json_array(chunks)) == RECORDS, (first, second)
+
+
+def test_field_filter_and_most_recent():
+    data = body(False)
+    expected = [{key: value for key, value in record.items() if key in METAR_FIELDS}
+                for record in RECORDS if record['mostRecent'] == 1]
+    for offset in range(len(data) + 1):
+        assert list(iter_metar_records([data[:offset], data[offset:]])) == expected, offset
+
+
+def test_numbers_split_across_chunks():
+    data = b'[12345, -6.5e3, true, null, "x"]'
+    for offset in range(len(data) + 1):
+        assert list(iter_json_array([data[:offset], data[offset:]])) == [12345, -6500.0, True, None, "x"], offset
+
+
+@pytest.mark.parametrize('data', [b'', b'[', b'[{"a": 1}', b'[{"a": 1},', b'{"a": 1}', b'[{"a": }]'])
+def test_malformed(data):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array([data]))
+
+
+def test_empty_array():
+    assert list(iter_json_array([b' [ ', b' ] '])) == []